@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Jointure / comparaison de rapports volumineux, clé = colonne "target".
+
+Aucun des deux fichiers n'est chargé en mémoire :
+1) tri externe : chaque fichier est lu par blocs de CHUNK_ROWS lignes,
+   chaque bloc est trié puis écrit dans un fichier temporaire ;
+2) fusion : heapq.merge relit les blocs triés en flux ;
+3) jointure par fusion : les deux flux triés avancent ensemble.
+
+Commandes :
+- join    : jointure externe complète (ex. rapport TP 2 + rapport TP 3)
+            les colonnes en double côté droit sont préfixées par "right_"
+- compare : différences entre deux runs (ex. semaine dernière / aujourd'hui)
+            une ligne par changement : target, change, column, old, new
+
+Usage :
+    python report_join.py join "../TP 2/report.csv" "../TP 3/report.csv" -o joined.csv
+    python report_join.py compare old/report.csv new/report.csv -o changes.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import heapq
+import sys
+import tempfile
+from collections import Counter
+from itertools import groupby
+from operator import itemgetter
+from pathlib import Path
+from typing import Iterator
+
+KEY_COLUMN = "target"
+CHUNK_ROWS = 100_000
+
+csv.field_size_limit(1 << 24)
+
+
+def _write_run(rows: list[list[str]], key: int, tmpdir: Path, n: int) -> Path:
+    rows.sort(key=itemgetter(key))
+    path = tmpdir / f"run_{n:05d}.csv"
+    with path.open("w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(rows)
+    return path
+
+
+def _read_run(path: Path) -> Iterator[list[str]]:
+    with path.open(newline="", encoding="utf-8") as f:
+        yield from csv.reader(f)
+
+
+def external_sort(path: Path, tmpdir: Path, chunk_rows: int = CHUNK_ROWS) -> tuple[list[str], Iterator[list[str]]]:
+    """Retour : (en-tête, lignes triées par target en flux)."""
+    runs: list[Path] = []
+    with path.open(newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        if KEY_COLUMN not in header:
+            raise ValueError(f"colonne '{KEY_COLUMN}' absente de {path}")
+        key = header.index(KEY_COLUMN)
+
+        chunk: list[list[str]] = []
+        width = len(header)
+        for row in reader:
+            if not row:
+                continue  # ligne vide
+            if len(row) < width:
+                row += [""] * (width - len(row))  # ligne courte : colonnes manquantes vides
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                runs.append(_write_run(chunk, key, tmpdir, len(runs)))
+                chunk = []
+        if chunk:
+            runs.append(_write_run(chunk, key, tmpdir, len(runs)))
+
+    return header, heapq.merge(*(_read_run(r) for r in runs), key=itemgetter(key))
+
+
+def merge_join(
+    left: Iterator[list[str]], lkey: int, right: Iterator[list[str]], rkey: int
+) -> Iterator[tuple[str, list[list[str]], list[list[str]]]]:
+    """
+    Jointure externe complète de deux flux triés.
+    Retour : (target, lignes gauche, lignes droite) ; une liste vide = absent.
+    Seules les lignes d'une même cible sont gardées en mémoire.
+    """
+    lgroups = ((k, list(g)) for k, g in groupby(left, key=itemgetter(lkey)))
+    rgroups = ((k, list(g)) for k, g in groupby(right, key=itemgetter(rkey)))
+    lcur = next(lgroups, None)
+    rcur = next(rgroups, None)
+
+    while lcur is not None or rcur is not None:
+        if rcur is None or (lcur is not None and lcur[0] < rcur[0]):
+            yield lcur[0], lcur[1], []
+            lcur = next(lgroups, None)
+        elif lcur is None or rcur[0] < lcur[0]:
+            yield rcur[0], [], rcur[1]
+            rcur = next(rgroups, None)
+        else:
+            yield lcur[0], lcur[1], rcur[1]
+            lcur = next(lgroups, None)
+            rcur = next(rgroups, None)
+
+
+def do_join(lheader: list[str], rheader: list[str], joined, writer) -> int:
+    rkey = rheader.index(KEY_COLUMN)
+    right_cols = [i for i in range(len(rheader)) if i != rkey]
+    writer.writerow(lheader + [f"right_{rheader[i]}" if rheader[i] in lheader else rheader[i] for i in right_cols])
+
+    lkey = lheader.index(KEY_COLUMN)
+    empty_left = [""] * len(lheader)
+    empty_right = [""] * len(right_cols)
+    count = 0
+    for target, lrows, rrows in joined:
+        for lrow in lrows or [None]:
+            for rrow in rrows or [None]:
+                out = list(lrow) if lrow is not None else list(empty_left)
+                out[lkey] = target
+                out += [rrow[i] for i in right_cols] if rrow is not None else empty_right
+                writer.writerow(out)
+                count += 1
+    return count
+
+
+def do_compare(oheader: list[str], nheader: list[str], joined, writer) -> Counter:
+    writer.writerow(["target", "change", "column", "old", "new"])
+    common = [c for c in oheader if c in nheader and c != KEY_COLUMN]
+    oidx = {c: oheader.index(c) for c in common}
+    nidx = {c: nheader.index(c) for c in common}
+
+    stats: Counter = Counter()
+    for target, orows, nrows in joined:
+        if not orows:
+            writer.writerow([target, "added", "", "", ""])
+            stats["added"] += 1
+        elif not nrows:
+            writer.writerow([target, "removed", "", "", ""])
+            stats["removed"] += 1
+        else:
+            # Une cible présente plusieurs fois : on compare la dernière occurrence
+            old, new = orows[-1], nrows[-1]
+            deltas = [(c, old[oidx[c]], new[nidx[c]]) for c in common if old[oidx[c]] != new[nidx[c]]]
+            for column, before, after in deltas:
+                writer.writerow([target, "changed", column, before, after])
+            stats["changed" if deltas else "unchanged"] += 1
+    return stats
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Jointure / comparaison de rapports par target (tri externe)")
+    parser.add_argument("command", choices=["join", "compare"])
+    parser.add_argument("left", type=Path, help="rapport de gauche (ou ancien rapport pour compare)")
+    parser.add_argument("right", type=Path, help="rapport de droite (ou nouveau rapport pour compare)")
+    parser.add_argument("-o", "--output", type=Path, help="fichier CSV de sortie (défaut : sortie standard)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="lignes par bloc trié en mémoire")
+    args = parser.parse_args(argv)
+
+    for path in (args.left, args.right):
+        if not path.exists():
+            print(f"ERREUR: fichier introuvable: {path}")
+            return 2
+
+    out = args.output.open("w", newline="", encoding="utf-8") if args.output else sys.stdout
+    try:
+        with tempfile.TemporaryDirectory(prefix="report_join_") as tmp:
+            tmpdir = Path(tmp)
+            (tmpdir / "left").mkdir()
+            (tmpdir / "right").mkdir()
+            try:
+                lheader, lrows = external_sort(args.left, tmpdir / "left", args.chunk_rows)
+                rheader, rrows = external_sort(args.right, tmpdir / "right", args.chunk_rows)
+            except ValueError as e:
+                print(f"ERREUR: {e}")
+                return 2
+
+            joined = merge_join(lrows, lheader.index(KEY_COLUMN), rrows, rheader.index(KEY_COLUMN))
+            writer = csv.writer(out)
+            if args.command == "join":
+                count = do_join(lheader, rheader, joined, writer)
+                summary = f"Lignes jointes: {count}"
+            else:
+                stats = do_compare(lheader, rheader, joined, writer)
+                summary = ", ".join(f"{k}: {stats[k]}" for k in ("added", "removed", "changed", "unchanged"))
+    finally:
+        if args.output:
+            out.close()
+
+    if args.output:
+        print(f"OK: rapport généré -> {args.output.resolve()}")
+    print(summary, file=sys.stderr if not args.output else sys.stdout)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
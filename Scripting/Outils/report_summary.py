@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Synthèse d'un ou plusieurs report.csv (TP 1, TP 2 ou TP 3).
+
+Les fichiers sont chargés une seule fois en colonnes (transposition
+faite par zip, en C), puis chaque statistique est un calcul sur une
+colonne entière au lieu d'une boucle Python par ligne :
+- taux de joignabilité (ping OK)
+- matrice ports x statut (tcp_* / udp_*)
+- répartition par type, pays, ASN, statut API
+
+NumPy est utilisé s'il est installé, sinon collections.Counter.
+
+Usage : python report_summary.py "../TP 2/report.csv" "../TP 3/report.csv"
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+from collections import Counter
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:  # repli en Python pur
+    np = None
+
+TOP_N = 10
+
+CATEGORY_COLUMNS = {
+    "target_type": "Type de cible",
+    "ip_country": "Pays",
+    "ip_asn": "ASN",
+    "ip_org": "Organisation",
+    "api_status": "Statut API",
+    "ping": "Ping",
+}
+
+
+def load_columns(paths: list[Path]) -> dict[str, list[str]]:
+    """Concatène les fichiers colonne par colonne (les en-têtes peuvent différer)."""
+    columns: dict[str, list[str]] = {}
+    for path in paths:
+        with path.open(newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                continue
+            # Lignes vides ignorées, lignes courtes complétées : zip(*rows) s'arrête à la plus courte
+            width = len(header)
+            rows = [(row + [""] * (width - len(row)))[:width] for row in reader if row]
+        for name, values in zip(header, zip(*rows) if rows else [()] * len(header)):
+            # TP 1 nomme "type" ce que TP 2 / TP 3 appellent "target_type"
+            name = "target_type" if name == "type" else name
+            columns.setdefault(name, []).extend(values)
+    return columns
+
+
+def value_counts(values: list[str]) -> list[tuple[str, int]]:
+    """Retour : [(valeur, nombre)] trié par nombre décroissant."""
+    if np is not None:
+        uniques, counts = np.unique(np.asarray(values, dtype=object).astype(str), return_counts=True)
+        order = np.argsort(-counts, kind="stable")
+        return [(str(uniques[i]), int(counts[i])) for i in order]
+    return Counter(values).most_common()
+
+
+def rate(values: list[str], expected: str) -> float:
+    if not values:
+        return 0.0
+    if np is not None:
+        return float(np.mean(np.asarray(values, dtype=object) == expected))
+    return values.count(expected) / len(values)
+
+
+def summarize(columns: dict[str, list[str]]) -> dict:
+    total = max((len(v) for v in columns.values()), default=0)
+    summary: dict = {"total": total}
+
+    if "ping" in columns:
+        summary["reachability"] = rate(columns["ping"], "OK")
+
+    port_columns = [name for name in columns if name.startswith(("tcp_", "udp_"))]
+    matrix: dict[str, dict[str, int]] = {name: dict(value_counts(columns[name])) for name in port_columns}
+    summary["ports"] = matrix
+    summary["statuses"] = sorted({status for counts in matrix.values() for status in counts})
+
+    summary["categories"] = {
+        name: value_counts(columns[name])
+        for name in CATEGORY_COLUMNS
+        if name in columns
+    }
+    return summary
+
+
+def print_summary(summary: dict) -> None:
+    print(f"Cibles: {summary['total']}")
+    if "reachability" in summary:
+        print(f"Joignabilité (ping OK): {summary['reachability'] * 100:.1f} %")
+
+    if summary["ports"]:
+        statuses = summary["statuses"]
+        print()
+        print("Ports".ljust(10) + "".join(s.rjust(10) for s in statuses))
+        for name, counts in summary["ports"].items():
+            print(name.ljust(10) + "".join(str(counts.get(s, 0)).rjust(10) for s in statuses))
+
+    for name, counts in summary["categories"].items():
+        print()
+        print(f"{CATEGORY_COLUMNS[name]} ({name}):")
+        for value, count in counts[:TOP_N]:
+            print(f"  {value or '(vide)'}: {count}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Synthèse de rapports report.csv")
+    parser.add_argument("reports", nargs="+", type=Path, help="fichiers report.csv")
+    args = parser.parse_args(argv)
+
+    missing = [p for p in args.reports if not p.exists()]
+    if missing:
+        print(f"ERREUR: fichier introuvable: {missing[0]}")
+        return 2
+
+    print_summary(summarize(load_columns(args.reports)))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Récupération de bannière sur un port ouvert.
+
+On réutilise la connexion déjà établie par test_tcp (ou la session TLS
+de la sonde TLS) au lieu de se reconnecter :
+- SSH, FTP, SMTP... : le serveur parle en premier, on lit simplement ;
+- HTTP(S) : on envoie un HEAD minimal et on garde la ligne de statut
+  et l'en-tête Server.
+La bannière est nettoyée (caractères imprimables) et tronquée.
+"""
+
+from __future__ import annotations
+
+import socket
+
+BANNER_TIMEOUT_S = 1.0
+BANNER_READ_BYTES = 1024
+BANNER_MAX = 80
+
+HTTP_PORTS = {80, 443, 8000, 8080, 8443}
+
+
+def http_head(host_header: str) -> bytes:
+    return f"HEAD / HTTP/1.1\r\nHost: {host_header}\r\nUser-Agent: diag_network\r\nAccept: */*\r\n\r\n".encode()
+
+
+def _read_until(sock: socket.socket, marker: bytes) -> bytes:
+    data = b""
+    while len(data) < BANNER_READ_BYTES and marker not in data:
+        try:
+            chunk = sock.recv(BANNER_READ_BYTES - len(data))
+        except socket.timeout:
+            break  # on garde ce qui est déjà arrivé
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def clean_banner(raw: bytes) -> str:
+    text = raw.decode("utf-8", errors="replace")
+    text = "".join(c if c.isprintable() else " " for c in text)
+    text = " ".join(text.split())
+    return text[:BANNER_MAX]
+
+
+def summarize_http(raw: bytes) -> bytes:
+    """Ligne de statut + en-tête Server, le reste des en-têtes est ignoré."""
+    lines = raw.split(b"\r\n\r\n", 1)[0].split(b"\r\n")
+    server = [line for line in lines[1:] if line.lower().startswith(b"server:")]
+    return b" | ".join(lines[:1] + server)
+
+
+def grab_banner(sock: socket.socket, port: int, host_header: str, timeout: float = BANNER_TIMEOUT_S) -> str:
+    """
+    Retour : la bannière, "" si le service reste muet dans le délai.
+    La connexion n'est pas fermée (l'appelant en reste propriétaire).
+    """
+    try:
+        sock.settimeout(timeout)
+        if port in HTTP_PORTS:
+            sock.sendall(http_head(host_header))
+            return clean_banner(summarize_http(_read_until(sock, b"\r\n\r\n")))
+        return clean_banner(_read_until(sock, b"\n"))
+    except OSError:
+        return ""
@@ -1,26 +1,62 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
-import csv
-import ipaddress
+import argparse
 import platform
 import socket
 import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Callable, NamedTuple
+
+from banner import BANNER_TIMEOUT_S, HTTP_PORTS, grab_banner
+from history import HISTORY_FILE, History
+from http_health import HttpChecker
+from inventory import Equipement, load_inventory
+from pacing import Deadline, Pacer, interleave_by_prefix, prefix_key
+from ping_sampler import STATS_COLUMNS, icmp_families, ping_batch, ping_stats
+from progress import Progress
+from ptr_lookup import BulkPtr, PtrCache
+from sinks import COMPRESSIONS, SINKS, SUFFIXES, manifest_path, open_sink, zstandard
+from synscan import SynScanner
+from targets import DEFAULT_PRIO, Target, classify_targets, pack_ip, read_targets
+from tls_probe import TlsProber
+from udp_probes import udp_probe_batch
 
 TARGETS_FILE = Path("targets.txt")
 REPORT_FILE = Path("report.csv")
 
 PORTS_TO_TEST = [22, 443]
+UDP_PORTS_TO_TEST = [53, 123, 161]
+TLS_PORT = 443
 TIMEOUT_S = 2
+HTTP_CHECK_PORTS = [port for port in PORTS_TO_TEST if port in HTTP_PORTS]
+HTTP_DEFAULT_PATHS = ["/"]
+
+WORKERS = 32          # sondes menées en parallèle
+MAX_PPS = 200         # plafond global de paquets/s (ICMP + SYN)
+PREFIX_PPS = 10       # plafond par préfixe de destination (/24, /64)
+PREFIX_BURST = 3      # paquets tolérés d'affilée vers un même préfixe
+
+WATCH_INTERVAL_S = 2  # --watch : fréquence de vérification du fichier de cibles
+
+
+class ScanContext(NamedTuple):
+    """Ce que partagent toutes les sondes d'un run."""
+    pacer: Pacer
+    tcp_check: Callable[[str, int, float], tuple[str, socket.socket | None]]
+    tls: TlsProber
+    banners: bool
+    http: HttpChecker | None
+    ping_count: int                # 0 : un seul ping, OK / KO
+    ping_families: frozenset[int]  # familles d'adresses dont les échos partent par lots depuis scan()
+    progress: Progress
+    deadline: Deadline
 
 
 def is_ip(value: str) -> bool:
-    try:
-        ipaddress.ip_address(value)
-        return True
-    except ValueError:
-        return False
+    return pack_ip(value) is not None
 
 
 def resolve_dns(name: str) -> str:
@@ -30,15 +66,15 @@ def resolve_dns(name: str) -> str:
         return ""
 
 
-def ping(host: str) -> str:
+def ping(host: str, timeout: float = TIMEOUT_S) -> str:
     try:
         system = platform.system().lower()
         if "windows" in system:
-            cmd = ["ping", "-n", "1", "-w", str(TIMEOUT_S * 1000), host]
+            cmd = ["ping", "-n", "1", "-w", str(int(timeout * 1000)), host]
         else:
             cmd = ["ping", "-c", "1", host]
 
-        r = subprocess.run(cmd, capture_output=True, text=True, timeout=TIMEOUT_S + 1)
+        r = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout + 1)
         return "OK" if r.returncode == 0 else "KO"
     except subprocess.TimeoutExpired:
         return "KO"
@@ -46,78 +82,545 @@ def ping(host: str) -> str:
         return "ERROR"
 
 
-def test_tcp(host: str, port: int) -> str:
+def open_tcp(host: str, port: int, timeout: float = TIMEOUT_S) -> tuple[str, socket.socket | None]:
+    """Comme test_tcp, mais la connexion établie est rendue ouverte à l'appelant."""
     try:
-        with socket.create_connection((host, port), timeout=TIMEOUT_S):
-            return "OPEN"
+        return "OPEN", socket.create_connection((host, port), timeout=timeout)
     except (TimeoutError, OSError):
-        return "CLOSED"
+        return "CLOSED", None
     except Exception:
-        return "ERROR"
+        return "ERROR", None
 
 
-def main() -> int:
-    if not TARGETS_FILE.exists():
-        print(f"ERREUR: fichier introuvable: {TARGETS_FILE}")
-        return 2
+def test_tcp(host: str, port: int, timeout: float = TIMEOUT_S) -> str:
+    status, sock = open_tcp(host, port, timeout)
+    if sock is not None:
+        sock.close()
+    return status
+
+
+def add_note(row: dict, note: str) -> None:
+    row["notes"] = f"{row['notes']} | {note}" if row["notes"] else note
+
+
+def skip(row: dict, columns: list[str]) -> None:
+    """Échéance dépassée : les sondes pas encore faites valent SKIPPED."""
+    for column in columns:
+        row[column] = "SKIPPED"
+    if "deadline" not in row["notes"]:
+        add_note(row, "deadline")
+
+
+def http_columns(port: int) -> list[str]:
+    return [f"http_{port}_status", f"http_{port}_ttfb_ms", f"http_{port}_ms"]
+
+
+def sampled(packed: bytes | None, ctx: ScanContext) -> bool:
+    """Vrai si l'échantillonneur ICMP se charge du ping de cette adresse."""
+    if packed is None:
+        return False  # nom non résolu : ping par cible, sur le nom
+    return (socket.AF_INET6 if len(packed) == 16 else socket.AF_INET) in ctx.ping_families
+
+
+def new_row(target: Target) -> dict:
+    return {
+        "target": target.raw,
+        "device_name": "",
+        "device_type": "",
+        "target_type": "DNS",
+        "ip_valid": "na",
+        "dns_resolved_ip": "",
+        "ptr": "",
+        "ping": "ERROR",
+        **{column: "" for column in STATS_COLUMNS},
+        **{f"tcp_{port}": "ERROR" for port in PORTS_TO_TEST},
+        **{f"udp_{port}": "ERROR" for port in UDP_PORTS_TO_TEST},
+        "tls_version": "",
+        "tls_ms": "",
+        "tls_subject": "",
+        "tls_expiry": "",
+        **{column: "" for port in HTTP_CHECK_PORTS for column in http_columns(port)},
+        **{f"banner_{port}": "" for port in PORTS_TO_TEST},
+        "notes": "",
+    }
+
 
-    targets = [line.strip() for line in TARGETS_FILE.read_text(encoding="utf-8").splitlines() if line.strip()]
-
-    fieldnames = [
-        "target",
-        "target_type",
-        "ip_valid",
-        "dns_resolved_ip",
-        "ping",
-        "tcp_22",
-        "tcp_443",
-        "notes",
-    ]
-
-    with REPORT_FILE.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-
-        for t in targets:
-            row = {
-                "target": t,
-                "target_type": "DNS",
-                "ip_valid": "na",
-                "dns_resolved_ip": "",
-                "ping": "ERROR",
-                "tcp_22": "ERROR",
-                "tcp_443": "ERROR",
-                "notes": "",
-            }
-
-            try:
-                if is_ip(t):
-                    row["target_type"] = "IP"
-                    row["ip_valid"] = "true"
-                    host_for_tests = t
+def prepare_target(target: Target, deadline: Deadline) -> tuple[dict, str, bytes | None]:
+    """
+    Résout le DNS d'une cible déjà classée.
+    Retour : (ligne du rapport, hôte à sonder, adresse binaire ou None).
+    """
+    row = new_row(target)
+    host_for_tests = target.name
+    packed = target.packed
+
+    try:
+        if target.kind == "IP":
+            row["target_type"] = "IP"
+            row["ip_valid"] = "true"
+        elif deadline.expired():
+            row["target_type"] = "DNS"
+            # Pas de résolution : les sondes UDP (sur IP uniquement) n'auront pas lieu
+            skip(row, [f"udp_{port}" for port in UDP_PORTS_TO_TEST])
+        else:
+            row["target_type"] = "DNS"
+            resolved = resolve_dns(target.name)
+            row["dns_resolved_ip"] = resolved
+            if resolved:
+                host_for_tests = resolved
+                packed = pack_ip(resolved)
+            else:
+                row["notes"] = "DNS failed"
+    except Exception as e:
+        row["notes"] = f"Unhandled error: {type(e).__name__}"
+
+    return row, host_for_tests, packed
+
+
+def probe_target(row: dict, host: str, packed: bytes | None, name: str, ctx: ScanContext) -> None:
+    """name : nom normalisé de la cible (Target.name), pour le SNI et l'en-tête Host."""
+    # Connexions ouvertes par les tests TCP, réutilisées par TLS et les bannières
+    conns: dict[int, socket.socket] = {}
+    # Le cadencement travaille sur l'adresse binaire quand on l'a
+    pace_key = packed if packed is not None else host
+    tcp_columns = [f"tcp_{port}" for port in PORTS_TO_TEST]
+
+    try:
+        # Ping (même si DNS KO: on tente sur le nom, cela peut marcher si DNS local/hosts)
+        # Le cadencement refuse un créneau qui tomberait après l'échéance
+        # Avec l'échantillonneur ICMP, les échos partent par lots depuis scan()
+        if not sampled(packed, ctx):
+            if not ctx.pacer.acquire(pace_key, packets=max(ctx.ping_count, 1), until=ctx.deadline.end):
+                skip(row, ["ping", *tcp_columns])
+                return
+            with ctx.progress.stage("ping", probes=max(ctx.ping_count, 1)):
+                if ctx.ping_count:
+                    row.update(ping_stats(host, ctx.ping_count, ctx.deadline.timeout(TIMEOUT_S)))
+                else:
+                    row["ping"] = ping(host, ctx.deadline.timeout(TIMEOUT_S))
+
+        # Tests TCP
+        for i, port in enumerate(PORTS_TO_TEST):
+            if not ctx.pacer.acquire(pace_key, until=ctx.deadline.end):
+                skip(row, tcp_columns[i:])
+                break
+            with ctx.progress.stage("tcp"):
+                status, sock = ctx.tcp_check(host, port, ctx.deadline.timeout(TIMEOUT_S))
+            row[f"tcp_{port}"] = status
+            if sock is not None:
+                if ctx.banners or port == TLS_PORT or (ctx.http is not None and port in HTTP_CHECK_PORTS):
+                    conns[port] = sock
                 else:
-                    row["target_type"] = "DNS"
-                    resolved = resolve_dns(t)
-                    row["dns_resolved_ip"] = resolved
-                    host_for_tests = resolved if resolved else t
-                    if not resolved:
-                        row["notes"] = "DNS failed"
+                    sock.close()
+
+        host_header = f"[{name}]" if ":" in name else name
+        sni = name if row["target_type"] == "DNS" else None
+
+        # TLS seulement si le port a répondu
+        if row.get(f"tcp_{TLS_PORT}") == "OPEN" and not ctx.deadline.expired():
+            raw = conns.pop(TLS_PORT, None)
+            if raw is None and ctx.pacer.acquire(pace_key, until=ctx.deadline.end):
+                _, raw = open_tcp(host, TLS_PORT, ctx.deadline.timeout(TIMEOUT_S))
+            if raw is not None:
+                with ctx.progress.stage("tls"):
+                    tls_columns, tls_sock = ctx.tls.handshake(
+                        raw, host, TLS_PORT, sni, timeout=ctx.deadline.timeout(TIMEOUT_S)
+                    )
+                row.update(tls_columns)
+                if tls_sock is not None:
+                    conns[TLS_PORT] = tls_sock
+
+        # Santé HTTP(S) : sur la connexion de test_tcp / TLS, avant les bannières
+        # (qui reprennent ensuite la même connexion si le serveur l'a gardée)
+        if ctx.http is not None:
+            for port in HTTP_CHECK_PORTS:
+                if row[f"tcp_{port}"] != "OPEN" or ctx.deadline.expired():
+                    continue
+                if port == TLS_PORT and port not in conns:
+                    continue  # poignée de main TLS ratée : rien à demander
+
+                def reconnect(port: int = port) -> socket.socket | None:
+                    if not ctx.pacer.acquire(pace_key, until=ctx.deadline.end):
+                        return None
+                    _, sock = open_tcp(host, port, ctx.deadline.timeout(TIMEOUT_S))
+                    if sock is None or port != TLS_PORT:
+                        return sock
+                    # Reprise de la session TLS : pas de poignée de main complète
+                    _, sock = ctx.tls.handshake(sock, host, port, sni, timeout=ctx.deadline.timeout(TIMEOUT_S))
+                    return sock
+
+                with ctx.progress.stage("http", probes=len(ctx.http.paths)):
+                    results, sock = ctx.http.check(
+                        conns.pop(port, None), host, host_header, reconnect, ctx.deadline.timeout(TIMEOUT_S)
+                    )
+                if sock is not None:
+                    conns[port] = sock
+                # Plusieurs chemins : une valeur par chemin, séparées par ";"
+                for column, values in zip(http_columns(port), zip(*results)):
+                    row[column] = ";".join(values)
+
+        # Bannières sur les ports ouverts (en mode --syn il faut se connecter)
+        if ctx.banners:
+            for port in PORTS_TO_TEST:
+                if row[f"tcp_{port}"] != "OPEN" or ctx.deadline.expired():
+                    continue
+                sock = conns.get(port)
+                if sock is None and port != TLS_PORT:
+                    if not ctx.pacer.acquire(pace_key, until=ctx.deadline.end):
+                        continue
+                    _, sock = open_tcp(host, port, ctx.deadline.timeout(TIMEOUT_S))
+                    if sock is not None:
+                        conns[port] = sock
+                if sock is not None:
+                    with ctx.progress.stage("banner"):
+                        row[f"banner_{port}"] = grab_banner(
+                            sock, port, host_header, timeout=ctx.deadline.timeout(BANNER_TIMEOUT_S)
+                        )
+
+    except Exception as e:
+        row["notes"] = f"Unhandled error: {type(e).__name__}"
+        # On garde ERROR dans les champs déjà initialisés
+    finally:
+        for sock in conns.values():
+            sock.close()
+        ctx.progress.target_done()
+
+
+def parse_args(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Diagnostic réseau -> report.csv")
+    parser.add_argument(
+        "--syn",
+        action="store_true",
+        help="scan SYN semi-ouvert pour les ports TCP (root / CAP_NET_RAW) : OPEN / CLOSED / FILTERED",
+    )
+    parser.add_argument(
+        "--banners",
+        action="store_true",
+        help="lit la bannière des ports ouverts (colonnes banner_<port>)",
+    )
+    parser.add_argument(
+        "--http",
+        action="store_true",
+        help="contrôle de santé HTTP(S) des ports web ouverts (colonnes http_<port>_*)",
+    )
+    parser.add_argument(
+        "--http-path",
+        action="append",
+        default=None,
+        metavar="CHEMIN",
+        help="chemin à demander avec --http (répétable, défaut : /)",
+    )
+    parser.add_argument(
+        "--http-method",
+        choices=["GET", "HEAD"],
+        default="GET",
+        help="méthode des requêtes --http",
+    )
+    parser.add_argument(
+        "--ping-count",
+        type=int,
+        default=0,
+        metavar="N",
+        help="envoie N échos par cible (colonnes ping_loss_pct, rtt_*) : socket ICMP partagé, sinon ping -c N",
+    )
+    parser.add_argument(
+        "--format",
+        choices=sorted(SINKS),
+        default="csv",
+        help="format du rapport (report.csv / report.jsonl / report.db)",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        default=None,
+        metavar="SECONDES",
+        help="budget de temps du run : cibles prioritaires d'abord, le reste est SKIPPED",
+    )
+    parser.add_argument(
+        "--inventory",
+        type=Path,
+        default=None,
+        metavar="FICHIER",
+        help="inventaire CSV/JSON (name, ip, type) à la place de targets.txt (colonnes device_name / device_type)",
+    )
+    parser.add_argument(
+        "--history",
+        type=Path,
+        nargs="?",
+        const=HISTORY_FILE,
+        default=None,
+        metavar="FICHIER",
+        help="ajoute les résultats du run à l'historique (history.db, voir history.py)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="reste actif : à chaque modification du fichier de cibles, ne sonde que les cibles ajoutées",
+    )
+    parser.add_argument(
+        "--compress",
+        choices=list(COMPRESSIONS),
+        default="none",
+        help="compression à la volée des rapports csv / jsonl (zstd : module zstandard requis)",
+    )
+    parser.add_argument(
+        "--rotate-mb",
+        type=float,
+        default=0,
+        metavar="MO",
+        help="découpe le rapport csv / jsonl en parties de MO mégaoctets, listées dans report.<format>.manifest.json",
+    )
+    return parser.parse_args(argv)
+
+
+REPORT_FIELDS = [
+    "target",
+    "device_name",
+    "device_type",
+    "target_type",
+    "ip_valid",
+    "dns_resolved_ip",
+    "ptr",
+    "ping",
+    *STATS_COLUMNS,
+    *[f"tcp_{port}" for port in PORTS_TO_TEST],
+    *[f"udp_{port}" for port in UDP_PORTS_TO_TEST],
+    "tls_version",
+    "tls_ms",
+    "tls_subject",
+    "tls_expiry",
+    *[column for port in HTTP_CHECK_PORTS for column in http_columns(port)],
+    *[f"banner_{port}" for port in PORTS_TO_TEST],
+    "notes",
+]
+
+
+def load_entries(source: Path, inventory: bool) -> tuple[list[tuple[str, int]], list[Equipement | None]]:
+    """
+    Lit la source des cibles : l'inventaire (on sonde l'IP, ou le nom si pas d'IP) ou targets.txt.
+    Retour : ([(cible, priorité)], [équipement ou None], dans l'ordre du fichier).
+    """
+    if inventory:
+        equipements, rejected = load_inventory(source)
+        print(f"Inventaire: {len(equipements)} équipements ({rejected} lignes rejetées)")
+        devices: list[Equipement | None] = list(equipements)
+        return [(eq.ip or eq.name, DEFAULT_PRIO) for eq in devices], devices
+    entries = read_targets(source)
+    return entries, [None] * len(entries)
+
+
+def scan(entries: list[tuple[str, int]], ctx: ScanContext, ptr_cache: PtrCache) -> list[dict]:
+    """Sonde les cibles données. Retour : les lignes du rapport, dans l'ordre des entrées."""
+    targets = classify_targets(value for value, _ in entries)
+    prios = [prio for _, prio in entries]
+    pacer, progress, deadline = ctx.pacer, ctx.progress, ctx.deadline
+    # BulkPtr ne sert qu'une fois (collect() ferme son pool) ; le cache, lui, est partagé
+    ptr = BulkPtr(ptr_cache)
+
+    def acquire(host: str) -> bool:
+        """Cadencement des sondes par lots (UDP, ICMP) : False passé l'échéance."""
+        if not pacer.acquire(host, until=deadline.end):
+            return False
+        progress.add_probes()
+        return True
+
+    def udp_stage(hosts: list[str]) -> dict[tuple[str, int], str]:
+        with progress.stage("udp", probes=0):
+            return udp_probe_batch(
+                hosts, UDP_PORTS_TO_TEST, deadline.timeout(TIMEOUT_S), acquire, deadline.end
+            )
+
+    def ping_stage(hosts: list[str]) -> dict[str, dict]:
+        with progress.stage("ping", probes=0):
+            return ping_batch(hosts, ctx.ping_count, deadline.timeout(TIMEOUT_S), acquire, deadline.end)
+
+    # Priorité d'abord (1 = la plus urgente), ordre du fichier ensuite
+    by_prio = sorted(range(len(targets)), key=lambda i: prios[i])
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        resolved = pool.map(lambda i: prepare_target(targets[i], deadline), by_prio)
+        prepared: list = [None] * len(targets)
+        for i, item in zip(by_prio, resolved):
+            prepared[i] = item
+
+        # PTR et UDP : un seul lot pour toutes les IP, en parallèle des sondes par cible
+        udp_hosts = list(dict.fromkeys(prepared[i][1] for i in by_prio if prepared[i][2] is not None))
+        ptr.start(udp_hosts)
+        udp_future = pool.submit(udp_stage, udp_hosts)
+        ping_hosts = list(dict.fromkeys(prepared[i][1] for i in by_prio if sampled(prepared[i][2], ctx)))
+        ping_future = pool.submit(ping_stage, ping_hosts) if ping_hosts else None
+
+        # Dans chaque niveau de priorité, on alterne les sous-réseaux
+        levels: dict[int, list] = {}
+        for i in by_prio:
+            levels.setdefault(prios[i], []).append(i)
+        schedule = [
+            i
+            for prio in sorted(levels)
+            for i in interleave_by_prefix(levels[prio], key=lambda i: prefix_key(prepared[i][2] or prepared[i][1]))
+        ]
+        futures = [pool.submit(probe_target, *prepared[i], targets[i].name, ctx) for i in schedule]
+        for future in futures:
+            future.result()
+
+        udp_results = udp_future.result()
+        ping_results = ping_future.result() if ping_future is not None else {}
+        ptr_names = ptr.collect(min(ptr.grace, deadline.remaining()))
+        for row, host, _ in prepared:
+            row["ptr"] = ptr_names.get(host, "")
+            stats = ping_results.get(host)
+            if stats is not None and stats["ping"] == "SKIPPED":
+                skip(row, ["ping"])
+            elif stats is not None:
+                row.update(stats)
+            for port in UDP_PORTS_TO_TEST:
+                status = udp_results.get((host, port))
+                if status == "SKIPPED":
+                    skip(row, [f"udp_{port}"])
+                elif status is not None:
+                    row[f"udp_{port}"] = status
+
+    return [row for row, _, _ in prepared]
+
+
+def write_report(rows: list[dict], fmt: str, compress: str = "none", part_bytes: int = 0) -> Path:
+    """
+    Les sorties écrivent dans un fichier temporaire puis le renomment (os.replace) :
+    un lecteur voit l'ancien rapport ou le nouveau, jamais un rapport à moitié écrit.
+    Retour : le fichier à lire (le manifeste si le rapport est découpé).
+    """
+    report_file = REPORT_FILE.with_suffix(SUFFIXES[fmt])
+    with open_sink(fmt, report_file, REPORT_FIELDS, compress, part_bytes) as sink:
+        for row in rows:
+            sink.write(row)
+    if part_bytes:
+        return manifest_path(report_file)
+    return report_file.with_name(report_file.name + COMPRESSIONS[compress])
+
+
+def assemble(entries: list[tuple[str, int]], devices: list[Equipement | None], results: dict[str, dict]) -> list[dict]:
+    """Lignes du rapport dans l'ordre du fichier, avec le nom / type d'équipement à jour."""
+    rows = []
+    for (value, _), device in zip(entries, devices):
+        # Copie : deux équipements peuvent partager une IP, donc le même résultat
+        row = dict(results[value])
+        if device is not None:
+            row["device_name"], row["device_type"] = device.name, device.type
+        rows.append(row)
+    return rows
+
+
+def file_signature(path: Path) -> tuple[int, int] | None:
+    """(date de modification, taille) : un stat() suffit à voir qu'un fichier a changé."""
+    try:
+        st = path.stat()
+    except OSError:
+        return None  # fichier en cours de remplacement par l'éditeur
+    return st.st_mtime_ns, st.st_size
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+
+    if args.format == "sqlite" and (args.compress != "none" or args.rotate_mb):
+        print("ERREUR: --compress et --rotate-mb ne s'appliquent qu'aux formats csv et jsonl")
+        return 2
+    if args.compress == "zstd" and zstandard is None:
+        print("ERREUR: --compress zstd nécessite le module zstandard (pip install zstandard)")
+        return 2
+    part_bytes = int(args.rotate_mb * 1024 * 1024)
+
+    source = args.inventory if args.inventory is not None else TARGETS_FILE
+    if not source.exists():
+        print(f"ERREUR: fichier introuvable: {source}")
+        return 2
+
+    # Partagés entre les passes du mode --watch
+    pacer = Pacer(MAX_PPS, PREFIX_PPS, PREFIX_BURST)
+    ptr_cache = PtrCache()
+    tls = TlsProber(TIMEOUT_S)
+
+    scanner = None
+    tcp_check = open_tcp
+    if args.syn:
+        try:
+            scanner = SynScanner(TIMEOUT_S)
+        except PermissionError:
+            print("ERREUR: le mode --syn nécessite les droits root (CAP_NET_RAW)")
+            return 2
+
+        # IPv6 / nom non résolu : le socket brut ne sait pas faire, on garde connect()
+        def tcp_check(host: str, port: int, timeout: float) -> tuple[str, socket.socket | None]:
+            status = scanner.scan(host, port, timeout)
+            return open_tcp(host, port, timeout) if status == "ERROR" else (status, None)
+
+    http = None
+    if args.http:
+        http = HttpChecker(args.http_path or HTTP_DEFAULT_PATHS, args.http_method, timeout=TIMEOUT_S)
+
+    # Échantillonneur ICMP pour chaque famille que le système autorise, sinon `ping -c N` par cible
+    ping_families: frozenset[int] = frozenset()
+    if args.ping_count > 0:
+        ping_families = icmp_families()
+        if socket.AF_INET not in ping_families:
+            print("ATTENTION: pas de socket ICMP (ping_group_range / CAP_NET_RAW), repli sur la commande ping")
+
+    history = History(args.history) if args.history is not None else None
+
+    def run(entries: list[tuple[str, int]]) -> list[dict]:
+        progress = Progress(len(entries)).start()
+        ctx = ScanContext(
+            pacer, tcp_check, tls, args.banners, http, args.ping_count, ping_families,
+            progress, Deadline(args.deadline),
+        )
+        try:
+            rows = scan(entries, ctx, ptr_cache)
+        finally:
+            progress.close()
+        # En mode --watch, seules les cibles sondées à cette passe entrent dans l'historique
+        if history is not None:
+            history.record(rows)
+        return rows
+
+    try:
+        signature = file_signature(source)
+        entries, devices = load_entries(source, args.inventory is not None)
+        # Résultats par cible : en mode --watch, seules les nouvelles cibles sont sondées
+        results: dict[str, dict] = {}
+        new_entries = list({value: (value, prio) for value, prio in entries}.values())
+        results.update(zip((value for value, _ in new_entries), run(new_entries)))
 
-                # Ping (même si DNS KO: on tente sur le nom, cela peut marcher si DNS local/hosts)
-                row["ping"] = ping(host_for_tests)
+        # Le rapport garde l'ordre du fichier de cibles, même partiel
+        report_file = write_report(assemble(entries, devices, results), args.format, args.compress, part_bytes)
+        print(f"OK: rapport généré -> {report_file.resolve()}")
+        print(f"Cibles traitées: {len(entries)}")
 
-                # Tests TCP
-                row["tcp_22"] = test_tcp(host_for_tests, 22)
-                row["tcp_443"] = test_tcp(host_for_tests, 443)
+        while args.watch:
+            time.sleep(WATCH_INTERVAL_S)
+            current = file_signature(source)
+            if current is None or current == signature:
+                continue
+            signature = current
 
-            except Exception as e:
-                row["notes"] = f"Unhandled error: {type(e).__name__}"
-                # On garde ERROR dans les champs déjà initialisés
+            entries, devices = load_entries(source, args.inventory is not None)
+            wanted = {value for value, _ in entries}
+            removed = [value for value in results if value not in wanted]
+            for value in removed:
+                del results[value]
+            new_entries = list({value: (value, prio) for value, prio in entries if value not in results}.values())
+            if new_entries:
+                results.update(zip((value for value, _ in new_entries), run(new_entries)))
 
-            writer.writerow(row)
+            report_file = write_report(assemble(entries, devices, results), args.format, args.compress, part_bytes)
+            print(f"OK: rapport mis à jour -> {report_file.resolve()} (+{len(new_entries)} / -{len(removed)} cibles)")
 
-    print(f"OK: rapport généré -> {REPORT_FILE.resolve()}")
-    print(f"Cibles traitées: {len(targets)}")
+    except KeyboardInterrupt:
+        print("Arrêt demandé.")
+    finally:
+        if scanner is not None:
+            scanner.close()
+        if history is not None:
+            history.close()
     return 0
 
 
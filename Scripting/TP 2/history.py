@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Historique de joignabilité, alimenté par chaque run de diag_network (--history).
+
+Tout tient dans une base SQLite (history.db) de taille bornée par cible :
+- échantillons bruts : anneau de RAW_SAMPLES runs par cible
+  (case = numéro du run modulo la taille de l'anneau) ;
+- agrégats par minute (24 h) et par heure (30 jours), eux aussi en
+  anneau : case = début de la période modulo le nombre de cases.
+  Pour chaque contrôle (ping, tcp_*, udp_*) : nombre de résultats
+  joignables (OK / OPEN), injoignables (KO / CLOSED / FILTERED) et de
+  bascules entre les deux (instabilité), plus un histogramme du RTT
+  ICMP moyen (cases log2 en ms) pour les quantiles du contrôle ping.
+
+Les statuts d'un échantillon sont codés sur un octet par contrôle, les
+compteurs et histogrammes en tableaux binaires (array) : quelques
+centaines d'octets par cible et par période.
+
+Usage :
+    python history.py query 8.8.8.8 --check ping --since 24h
+    python history.py flapping --since 1h --min-changes 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sqlite3
+import time
+from array import array
+from pathlib import Path
+
+from sinks import is_status_column
+
+HISTORY_FILE = Path("history.db")
+
+RAW_SAMPLES = 288           # par cible : 24 h à raison d'un run toutes les 5 min
+MINUTE_SLOTS = 24 * 60      # agrégats par minute : 24 h
+HOUR_SLOTS = 30 * 24        # agrégats par heure : 30 jours
+HIST_BUCKETS = 16           # latence : <1 ms, 1-2, 2-4... >= 16 s
+
+# Latence enregistrée : RTT ICMP moyen seulement (--ping-count), propre au contrôle ping
+LATENCY_COLUMN = "rtt_avg_ms"
+LATENCY_CHECK = "ping"
+
+STATUS_CODES = {"": 0, "OK": 1, "OPEN": 2, "KO": 3, "CLOSED": 4, "FILTERED": 5, "ERROR": 6, "SKIPPED": 7}
+UP = {STATUS_CODES["OK"], STATUS_CODES["OPEN"]}
+DOWN = {STATUS_CODES["KO"], STATUS_CODES["CLOSED"], STATUS_CODES["FILTERED"]}
+
+ROLLUPS = {"rollup_1m": (60, MINUTE_SLOTS), "rollup_1h": (3600, HOUR_SLOTS)}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS targets (target TEXT PRIMARY KEY, seq INTEGER, last BLOB);
+CREATE TABLE IF NOT EXISTS samples (
+    target TEXT, slot INTEGER, ts INTEGER, statuses BLOB, latency REAL,
+    PRIMARY KEY (target, slot)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_1m (
+    target TEXT, slot INTEGER, start INTEGER, counts BLOB, hist BLOB,
+    PRIMARY KEY (target, slot)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_1h (
+    target TEXT, slot INTEGER, start INTEGER, counts BLOB, hist BLOB,
+    PRIMARY KEY (target, slot)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_rollup_1m_start ON rollup_1m (start);
+CREATE INDEX IF NOT EXISTS idx_rollup_1h_start ON rollup_1h (start);
+"""
+
+
+def parse_duration(text: str) -> int:
+    """ "90s", "30m", "24h", "7d" -> secondes """
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(float(text))
+
+
+def hist_bucket(latency_ms: float) -> int:
+    if latency_ms < 1:
+        return 0
+    return min(int(math.log2(latency_ms)) + 1, HIST_BUCKETS - 1)
+
+
+def hist_quantile(hist: array, q: float) -> float | None:
+    """Quantile approché : interpolation linéaire dans la case (bornes 2^(i-1) .. 2^i ms)."""
+    total = sum(hist)
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for i, count in enumerate(hist):
+        if count and seen + count >= rank:
+            low, high = (0.0, 1.0) if i == 0 else (2.0 ** (i - 1), 2.0 ** i)
+            return low + (high - low) * (rank - seen) / count
+        seen += count
+    return None
+
+
+def trim(hist: array) -> bytes:
+    """Histogramme sans ses cases vides de fin : les grandes latences sont rares."""
+    end = len(hist)
+    while end and not hist[end - 1]:
+        end -= 1
+    return hist[:end].tobytes()
+
+
+def exact_quantile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class History:
+    def __init__(self, path: Path = HISTORY_FILE) -> None:
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._db:
+            self._db.executescript(SCHEMA)
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'checks'").fetchone()
+        # Ordre des contrôles dans les blobs : les nouveaux sont ajoutés à la fin
+        self.checks: list[str] = json.loads(row[0]) if row else []
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self) -> "History":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # --- écriture ----------------------------------------------------------
+
+    def _check_index(self, rows: list[dict]) -> None:
+        known = set(self.checks)
+        for row in rows:
+            for column in row:
+                if is_status_column(column) and column not in known:
+                    self.checks.append(column)
+                    known.add(column)
+        self._db.execute(
+            "INSERT OR REPLACE INTO meta VALUES ('checks', ?)", (json.dumps(self.checks),)
+        )
+
+    def _load_rollups(self, table: str, start: int) -> dict[str, tuple[array, array]]:
+        out = {}
+        for target, counts, hist in self._db.execute(f"SELECT target, counts, hist FROM {table} WHERE start = ?", (start,)):
+            c, h = array("I"), array("I")
+            c.frombytes(counts)
+            h.frombytes(hist)
+            out[target] = (c, h)
+        return out
+
+    def record(self, rows: list[dict], ts: float | None = None) -> None:
+        """Enregistre les lignes d'un run (une par cible), en une transaction."""
+        ts = int(ts if ts is not None else time.time())
+        with self._db:
+            self._check_index(rows)
+            n = len(self.checks)
+            state = {t: (seq, last) for t, seq, last in self._db.execute("SELECT target, seq, last FROM targets")}
+            buckets = {table: ts - ts % period for table, (period, _) in ROLLUPS.items()}
+            current = {table: self._load_rollups(table, start) for table, start in buckets.items()}
+
+            samples, targets = [], []
+            rollups: dict[str, list] = {table: [] for table in ROLLUPS}
+            for row in rows:
+                target = row["target"]
+                statuses = bytes(STATUS_CODES.get(row.get(check, ""), 0) for check in self.checks)
+                try:
+                    latency = float(row.get(LATENCY_COLUMN, ""))
+                except ValueError:
+                    latency = None
+
+                seq, last = state.get(target, (-1, b""))
+                seq += 1
+                samples.append((target, seq % RAW_SAMPLES, ts, statuses, latency))
+
+                # Dernier statut joignable / injoignable connu, pour compter les bascules
+                last = bytearray(last.ljust(n, b"\0"))
+                changed = [False] * n
+                for i, code in enumerate(statuses):
+                    if code in UP or code in DOWN:
+                        if last[i] and (last[i] in UP) != (code in UP):
+                            changed[i] = True
+                        last[i] = code
+                targets.append((target, seq, bytes(last)))
+                state[target] = (seq, bytes(last))
+
+                for table, (period, slots) in ROLLUPS.items():
+                    counts, hist = current[table].setdefault(target, (array("I"), array("I")))
+                    counts.extend([0] * (3 * n - len(counts)))  # contrôles apparus depuis
+                    hist.extend([0] * (HIST_BUCKETS - len(hist)))
+                    for i, code in enumerate(statuses):
+                        if code in UP:
+                            counts[3 * i] += 1
+                        elif code in DOWN:
+                            counts[3 * i + 1] += 1
+                        if changed[i]:
+                            counts[3 * i + 2] += 1
+                    if latency is not None:
+                        hist[hist_bucket(latency)] += 1
+                    start = buckets[table]
+                    rollups[table].append((target, start // period % slots, start, counts.tobytes(), trim(hist)))
+
+            self._db.executemany("INSERT OR REPLACE INTO samples VALUES (?, ?, ?, ?, ?)", samples)
+            self._db.executemany("INSERT OR REPLACE INTO targets VALUES (?, ?, ?)", targets)
+            for table, values in rollups.items():
+                self._db.executemany(f"INSERT OR REPLACE INTO {table} VALUES (?, ?, ?, ?, ?)", values)
+
+    # --- lecture -----------------------------------------------------------
+
+    def query(self, target: str, check: str, since: int, now: float | None = None) -> dict:
+        """
+        Retour : {up, down, changes, fail_rate, latency_p50, latency_p95, source}.
+        Échantillons bruts si l'anneau couvre la période, sinon agrégats par minute / par heure.
+        Quantiles de latence (RTT ICMP) pour le contrôle ping seulement, None sinon.
+        """
+        now = int(now if now is not None else time.time())
+        begin = now - since
+        if check not in self.checks:
+            return {"up": 0, "down": 0, "changes": 0, "fail_rate": None,
+                    "latency_p50": None, "latency_p95": None, "source": "-"}
+        i = self.checks.index(check)
+
+        raw = self._db.execute(
+            "SELECT ts, statuses, latency FROM samples WHERE target = ? ORDER BY ts", (target,)
+        ).fetchall()
+        if raw and (raw[0][0] <= begin or len(raw) < RAW_SAMPLES):
+            up = down = changes = 0
+            latencies, previous = [], None
+            for ts, statuses, latency in raw:
+                if ts < begin:
+                    continue
+                code = statuses[i] if i < len(statuses) else 0
+                if code in UP or code in DOWN:
+                    up += code in UP
+                    down += code in DOWN
+                    if previous is not None and (previous in UP) != (code in UP):
+                        changes += 1
+                    previous = code
+                if latency is not None:
+                    latencies.append(latency)
+            p50, p95 = exact_quantile(latencies, 0.5), exact_quantile(latencies, 0.95)
+            source = "raw"
+        else:
+            table = "rollup_1m" if since <= MINUTE_SLOTS * 60 else "rollup_1h"
+            up = down = changes = 0
+            hist = array("I", [0] * HIST_BUCKETS)
+            for counts_blob, hist_blob in self._db.execute(
+                f"SELECT counts, hist FROM {table} WHERE target = ? AND start >= ?",
+                (target, begin - begin % ROLLUPS[table][0]),
+            ):
+                counts, h = array("I"), array("I")
+                counts.frombytes(counts_blob)
+                h.frombytes(hist_blob)
+                if 3 * i + 2 < len(counts):
+                    up += counts[3 * i]
+                    down += counts[3 * i + 1]
+                    changes += counts[3 * i + 2]
+                for b, count in enumerate(h):  # cases de fin absentes = 0
+                    hist[b] += count
+            p50, p95 = hist_quantile(hist, 0.5), hist_quantile(hist, 0.95)
+            source = table
+
+        if check != LATENCY_CHECK:
+            p50 = p95 = None
+
+        total = up + down
+        return {
+            "up": up,
+            "down": down,
+            "changes": changes,
+            "fail_rate": down / total if total else None,
+            "latency_p50": p50,
+            "latency_p95": p95,
+            "source": source,
+        }
+
+    def flapping(self, since: int, min_changes: int, now: float | None = None) -> list[tuple[str, str, int]]:
+        """Retour : [(cible, contrôle, bascules)] avec au moins `min_changes` bascules, les plus instables d'abord."""
+        now = int(now if now is not None else time.time())
+        begin = now - since
+        table = "rollup_1m" if since <= MINUTE_SLOTS * 60 else "rollup_1h"
+        totals: dict[tuple[str, int], int] = {}
+        for target, counts_blob in self._db.execute(
+            f"SELECT target, counts FROM {table} WHERE start >= ?", (begin - begin % ROLLUPS[table][0],)
+        ):
+            counts = array("I")
+            counts.frombytes(counts_blob)
+            for i in range(len(counts) // 3):
+                if counts[3 * i + 2]:
+                    totals[(target, i)] = totals.get((target, i), 0) + counts[3 * i + 2]
+        out = [(target, self.checks[i], n) for (target, i), n in totals.items() if n >= min_changes]
+        return sorted(out, key=lambda item: -item[2])
+
+
+def format_ms(value: float | None) -> str:
+    return f"{value:.1f} ms" if value is not None else "n/a"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Historique de joignabilité (history.db)")
+    parser.add_argument("--db", type=Path, default=HISTORY_FILE, help="base d'historique")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    query = sub.add_parser("query", help="taux d'échec et latence d'une cible")
+    query.add_argument("target")
+    query.add_argument("--check", default="ping", help="contrôle : ping, tcp_443, udp_53...")
+    query.add_argument("--since", default="24h", help="période : 90s, 30m, 24h, 7d")
+
+    flapping = sub.add_parser("flapping", help="contrôles qui basculent souvent")
+    flapping.add_argument("--since", default="1h")
+    flapping.add_argument("--min-changes", type=int, default=3)
+
+    args = parser.parse_args(argv)
+
+    if not args.db.exists():
+        print(f"ERREUR: fichier introuvable: {args.db}")
+        return 2
+
+    with History(args.db) as history:
+        if args.command == "query":
+            r = history.query(args.target, args.check, parse_duration(args.since))
+            rate = f"{r['fail_rate'] * 100:.1f}%" if r["fail_rate"] is not None else "n/a"
+            print(f"{args.target} {args.check} sur {args.since} ({r['source']}) :")
+            print(f"  joignable: {r['up']}  injoignable: {r['down']}  taux d'échec: {rate}  bascules: {r['changes']}")
+            if args.check == LATENCY_CHECK:
+                print(f"  RTT p50: {format_ms(r['latency_p50'])}  p95: {format_ms(r['latency_p95'])}")
+        else:
+            flaps = history.flapping(parse_duration(args.since), args.min_changes)
+            if not flaps:
+                print("Aucun contrôle instable.")
+            for target, check, changes in flaps:
+                print(f"{target} {check}: {changes} bascules")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Contrôle de santé HTTP(S) des ports web ouverts.
+
+Un port 443 OPEN ne dit pas que le service répond correctement : on
+envoie une requête GET (ou HEAD) sur chaque chemin configuré et on
+relève le code de statut, le temps jusqu'au premier octet (TTFB) et la
+durée totale de la réponse.
+
+- La connexion vient de test_tcp / de la sonde TLS : pas de nouvelle
+  poignée de main. Les chemins passent l'un après l'autre sur la même
+  connexion (HTTP/1.1 keep-alive) ; si le serveur la ferme, on en rouvre
+  une (la session TLS est alors reprise, voir tls_probe.py).
+- Plusieurs cibles peuvent pointer vers le même hôte : au plus
+  `per_host` contrôles simultanés par adresse.
+"""
+
+from __future__ import annotations
+
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import BinaryIO, Callable, Iterator
+
+HTTP_TIMEOUT_S = 2.0
+HTTP_PER_HOST = 2
+HTTP_MAX_BODY = 1 << 20   # au-delà, on lâche la connexion plutôt que de tout lire
+HTTP_MAX_HEADERS = 100
+
+NO_BODY_STATUS = {204, 304}
+
+
+class HttpError(Exception):
+    """Réponse illisible : la connexion n'est plus utilisable."""
+
+
+def http_request(method: str, path: str, host_header: str) -> bytes:
+    return (
+        f"{method} {path} HTTP/1.1\r\nHost: {host_header}\r\nUser-Agent: diag_network\r\n"
+        f"Accept: */*\r\nConnection: keep-alive\r\n\r\n"
+    ).encode()
+
+
+def _discard(reader: BinaryIO, n: int) -> None:
+    while n > 0:
+        chunk = reader.read(min(n, 65536))
+        if not chunk:
+            raise HttpError("connexion fermée")
+        n -= len(chunk)
+
+
+def _read_chunked(reader: BinaryIO) -> None:
+    total = 0
+    while True:
+        line = reader.readline(1024)
+        try:
+            size = int(line.split(b";", 1)[0], 16)
+        except ValueError:
+            raise HttpError("chunk invalide") from None
+        if size == 0:
+            # Trailers éventuels jusqu'à la ligne vide
+            while reader.readline(1024) not in (b"\r\n", b"\n", b""):
+                pass
+            return
+        total += size
+        if total > HTTP_MAX_BODY:
+            raise HttpError("corps trop long")
+        _discard(reader, size + 2)  # + CRLF de fin de chunk
+
+
+def read_response(reader: BinaryIO, method: str) -> tuple[int, float, bool]:
+    """
+    Lit une réponse complète.
+    Retour : (code de statut, instant du premier octet, connexion réutilisable).
+    """
+    if not reader.peek(1):
+        raise HttpError("connexion fermée")
+    first_byte = time.perf_counter()
+
+    parts = reader.readline(1024).split(None, 2)
+    if len(parts) < 2 or not parts[0].startswith(b"HTTP/"):
+        raise HttpError("ligne de statut invalide")
+    try:
+        status = int(parts[1])
+    except ValueError:
+        raise HttpError("code de statut invalide") from None
+
+    headers: dict[bytes, bytes] = {}
+    for _ in range(HTTP_MAX_HEADERS):
+        line = reader.readline(8192)
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.partition(b":")
+        headers[name.strip().lower()] = value.strip().lower()
+
+    keep_alive = headers.get(b"connection") != b"close" and parts[0] != b"HTTP/1.0"
+    if method == "HEAD" or status in NO_BODY_STATUS or 100 <= status < 200:
+        return status, first_byte, keep_alive
+
+    if headers.get(b"transfer-encoding", b"").endswith(b"chunked"):
+        _read_chunked(reader)
+    elif b"content-length" in headers:
+        try:
+            length = int(headers[b"content-length"])
+        except ValueError:
+            raise HttpError("Content-Length invalide") from None
+        if length > HTTP_MAX_BODY:
+            return status, first_byte, False
+        _discard(reader, length)
+    else:
+        return status, first_byte, False  # corps jusqu'à la fermeture : on s'arrête là
+    return status, first_byte, keep_alive
+
+
+class HttpChecker:
+    def __init__(
+        self,
+        paths: list[str],
+        method: str = "GET",
+        per_host: int = HTTP_PER_HOST,
+        timeout: float = HTTP_TIMEOUT_S,
+    ) -> None:
+        self.paths = paths
+        self.method = method
+        self.per_host = per_host
+        self.timeout = timeout
+        self._slots: dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _host_slot(self, host: str) -> Iterator[None]:
+        with self._lock:
+            slot = self._slots.setdefault(host, threading.BoundedSemaphore(self.per_host))
+        with slot:
+            yield
+
+    def check(
+        self,
+        sock: socket.socket | None,
+        host: str,
+        host_header: str,
+        reconnect: Callable[[], socket.socket | None],
+        timeout: float | None = None,
+    ) -> tuple[list[tuple[str, str, str]], socket.socket | None]:
+        """
+        Un contrôle par chemin, sur `sock` tant que le serveur garde la connexion,
+        sinon sur une connexion rendue par `reconnect()`.
+        Retour : ([(statut, ttfb_ms, total_ms) par chemin], connexion encore ouverte ou None).
+        Le statut vaut "ERROR" si la requête échoue ou si aucune connexion n'est possible.
+        """
+        results = []
+        reader = None
+        with self._host_slot(host):
+            for path in self.paths:
+                if sock is None:
+                    sock = reconnect()
+                    if sock is None:
+                        # Plus de connexion possible : inutile d'insister pour les chemins suivants
+                        results += [("ERROR", "", "")] * (len(self.paths) - len(results))
+                        break
+                if reader is None:
+                    sock.settimeout(timeout or self.timeout)
+                    reader = sock.makefile("rb")
+
+                try:
+                    start = time.perf_counter()
+                    sock.sendall(http_request(self.method, path, host_header))
+                    status, first_byte, keep_alive = read_response(reader, self.method)
+                    end = time.perf_counter()
+                    results.append((str(status), f"{(first_byte - start) * 1000:.1f}", f"{(end - start) * 1000:.1f}"))
+                except (HttpError, OSError):
+                    results.append(("ERROR", "", ""))
+                    keep_alive = False
+
+                if not keep_alive:
+                    # makefile() garde une référence : on le ferme avant le socket
+                    reader.close()
+                    reader = None
+                    sock.close()
+                    sock = None
+
+        if reader is not None:
+            reader.close()
+        return results, sock
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Inventaire d'équipements, sur le modèle de la fiche pratique tuples.py :
+
+    equipement = ("SW-CORE-01", "192.168.10.1", "switch")
+
+Chaque équipement est un tuple nommé (immuable, aussi compact qu'un
+tuple), chargé depuis un fichier CSV (colonnes name/nom, ip, type) ou
+JSON (liste d'objets ou liste de triplets).
+
+Index (recherches en O(1), même sur des centaines de milliers d'équipements) :
+- par nom (insensible à la casse)
+- par IP (clé = adresse binaire)
+- par type
+- par préfixe /24 (IPv4) ou /64 (IPv6) pour les recherches par sous-réseau
+"""
+
+from __future__ import annotations
+
+import csv
+import ipaddress
+import json
+import sys
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple
+
+from pacing import prefix_key
+from targets import pack_ip
+
+
+class Equipement(NamedTuple):
+    name: str
+    ip: str
+    type: str
+
+
+class Inventory:
+    def __init__(self, equipements: Iterable[Equipement] = ()) -> None:
+        self._by_name: dict[str, Equipement] = {}
+        self._by_ip: dict[bytes, Equipement] = {}
+        self._by_type: dict[str, list[Equipement]] = {}
+        self._by_prefix: dict[bytes, list[Equipement]] = {}
+        for eq in equipements:
+            self.add(eq)
+
+    def add(self, eq: Equipement) -> bool:
+        """Retour : False si un équipement du même nom (casse ignorée) existe déjà : le premier est gardé."""
+        if eq.name.lower() in self._by_name:
+            return False
+        # Les types se répètent énormément : une seule chaîne en mémoire par type
+        eq = eq._replace(type=sys.intern(eq.type))
+        self._by_name[eq.name.lower()] = eq
+        self._by_type.setdefault(eq.type, []).append(eq)
+        packed = pack_ip(eq.ip) if eq.ip else None
+        if packed is not None:
+            self._by_ip[packed] = eq
+            self._by_prefix.setdefault(prefix_key(packed), []).append(eq)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+    def __iter__(self) -> Iterator[Equipement]:
+        return iter(self._by_name.values())
+
+    def by_name(self, name: str) -> Equipement | None:
+        return self._by_name.get(name.lower())
+
+    def by_ip(self, ip: str | bytes) -> Equipement | None:
+        packed = ip if isinstance(ip, bytes) else pack_ip(ip)
+        return self._by_ip.get(packed) if packed is not None else None
+
+    def by_type(self, kind: str) -> list[Equipement]:
+        return self._by_type.get(kind, [])
+
+    def in_subnet(self, cidr: str) -> list[Equipement]:
+        """Équipements d'un sous-réseau, via l'index /24 (ou /64) : pas de parcours complet."""
+        net = ipaddress.ip_network(cidr, strict=False)
+        bucket_len = 24 if net.version == 4 else 64
+        if net.prefixlen >= bucket_len:
+            keys = [prefix_key(net.network_address.packed)]
+        elif 2 ** (bucket_len - net.prefixlen) <= len(self._by_prefix):
+            keys = [prefix_key(bucket.network_address.packed) for bucket in net.subnets(new_prefix=bucket_len)]
+        else:
+            # Réseau plus large que l'index (/8, /32 en IPv6...) : on parcourt les préfixes connus
+            size = net.max_prefixlen // 8
+            keys = [
+                key for key in self._by_prefix
+                if len(key) * 8 == bucket_len and ipaddress.ip_address(key.ljust(size, b"\0")) in net
+            ]
+
+        out = []
+        for key in keys:
+            bucket = self._by_prefix.get(key, [])
+            if net.prefixlen <= bucket_len:
+                out.extend(bucket)  # préfixe entièrement dans le réseau
+            else:
+                out.extend(eq for eq in bucket if ipaddress.ip_address(eq.ip) in net)
+        return out
+
+    def lookup(self, target: str) -> Equipement | None:
+        """Une cible de targets.txt : par IP si c'en est une, sinon par nom."""
+        return self.by_ip(target) or self.by_name(target)
+
+
+def _from_record(record) -> Equipement | None:
+    if isinstance(record, dict):
+        name = record.get("name", record.get("nom", ""))
+        ip = record.get("ip", "")
+        kind = record.get("type", "")
+    elif isinstance(record, (list, tuple)) and len(record) == 3:
+        name, ip, kind = record
+    else:
+        return None
+    name, ip, kind = str(name or "").strip(), str(ip or "").strip(), str(kind or "").strip()
+    if not name or (ip and pack_ip(ip) is None):
+        return None
+    return Equipement(name, ip, kind)
+
+
+def load_inventory(path: Path) -> tuple[Inventory, int]:
+    """Retour : (inventaire, nombre de lignes rejetées : sans nom, IP invalide ou nom en double)."""
+    if path.suffix.lower() == ".json":
+        records = json.loads(path.read_text(encoding="utf-8"))
+    else:
+        with path.open(newline="", encoding="utf-8") as f:
+            records = list(csv.DictReader(f))
+
+    inventory = Inventory()
+    rejected = 0
+    for record in records:
+        eq = _from_record(record)
+        if eq is None or not inventory.add(eq):
+            rejected += 1
+    return inventory, rejected
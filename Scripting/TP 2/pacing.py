@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Cadencement des sondes réseau (ping / test_tcp).
+
+- un plafond global de paquets par seconde, tous préfixes confondus ;
+- un seau à jetons par préfixe de destination (/24 en IPv4, /64 en IPv6)
+  pour ne pas envoyer de rafales vers un même sous-réseau ;
+- interleave_by_prefix() alterne les cibles entre sous-réseaux au lieu
+  de les sonder dans l'ordre du fichier ;
+- Deadline porte le budget de temps global du run (--deadline).
+"""
+
+from __future__ import annotations
+
+import socket
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Iterable, TypeVar
+
+T = TypeVar("T")
+
+# Au-delà de ce nombre de seaux par préfixe, on purge ceux qui sont au repos
+MAX_PREFIX_BUCKETS = 4096
+
+# Délai d'une sonde à l'approche de l'échéance : une part du temps restant, avec un plancher
+DEADLINE_TIMEOUT_SHARE = 0.25
+MIN_PROBE_TIMEOUT_S = 0.2
+
+
+def prefix_key(host: str | bytes) -> Hashable:
+    """
+    Clé de regroupement d'une destination :
+    - IPv4 : les 3 premiers octets (/24)
+    - IPv6 : les 8 premiers octets (/64)
+    - nom non résolu : le nom lui-même
+    host peut être l'adresse déjà en binaire (targets.pack_ip).
+    """
+    if isinstance(host, bytes):
+        return host[:3] if len(host) == 4 else host[:8]
+    for family, size in ((socket.AF_INET, 3), (socket.AF_INET6, 8)):
+        try:
+            return socket.inet_pton(family, host)[:size]
+        except OSError:
+            continue
+    return host
+
+
+class TokenBucket:
+    """
+    Seau à jetons au format GCRA (une seule horloge "tat" par seau).
+    rate : jetons par seconde ; burst : nombre de paquets tolérés d'affilée.
+    """
+
+    __slots__ = ("interval", "tolerance", "tat")
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self.interval = 1.0 / rate
+        self.tolerance = self.interval * max(burst - 1, 0)
+        self.tat = 0.0
+
+    def ready_at(self, now: float) -> float:
+        return max(now, self.tat - self.tolerance)
+
+    def consume(self, at: float, packets: int = 1) -> None:
+        self.tat = max(self.tat, at) + self.interval * packets
+
+
+class Pacer:
+    """
+    Limiteur partagé entre les threads de sondage.
+    acquire() bloque l'appelant jusqu'à ce que le plafond global ET celui
+    du préfixe de destination autorisent l'envoi. Avec until (instant
+    time.monotonic()), il rend False sans rien réserver si ce créneau
+    tombe après until.
+    Un débit <= 0 désactive le plafond correspondant.
+    """
+
+    def __init__(self, pps: float, prefix_pps: float, prefix_burst: int = 1) -> None:
+        self._lock = threading.Lock()
+        self._global = TokenBucket(pps, max(prefix_burst, 1)) if pps > 0 else None
+        self._prefix_pps = prefix_pps
+        self._prefix_burst = prefix_burst
+        self._prefixes: OrderedDict[Hashable, TokenBucket] = OrderedDict()
+
+    def _prefix_bucket(self, key: Hashable, now: float) -> TokenBucket:
+        bucket = self._prefixes.get(key)
+        if bucket is None:
+            if len(self._prefixes) >= MAX_PREFIX_BUCKETS:
+                self._evict_idle(now)
+            bucket = TokenBucket(self._prefix_pps, self._prefix_burst)
+            self._prefixes[key] = bucket
+        else:
+            self._prefixes.move_to_end(key)
+        return bucket
+
+    def _evict_idle(self, now: float) -> None:
+        # Un seau dont l'horloge est dépassée est plein : on peut l'oublier
+        while self._prefixes:
+            key, bucket = next(iter(self._prefixes.items()))
+            if bucket.tat > now and len(self._prefixes) < MAX_PREFIX_BUCKETS:
+                break
+            del self._prefixes[key]
+
+    def acquire(self, host: str | bytes, packets: int = 1, until: float | None = None) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            buckets = []
+            if self._global is not None:
+                buckets.append(self._global)
+            if self._prefix_pps > 0:
+                buckets.append(self._prefix_bucket(prefix_key(host), now))
+            if not buckets:
+                return until is None or now < until
+            at = max(b.ready_at(now) for b in buckets)
+            if until is not None and at >= until:
+                return False
+            for b in buckets:
+                b.consume(at, packets)
+
+        delay = at - now
+        if delay > 0:
+            time.sleep(delay)
+        return True
+
+
+def interleave_by_prefix(items: Iterable[T], key: Callable[[T], Hashable]) -> list[T]:
+    """
+    Réordonne les éléments en tourniquet entre préfixes :
+    [a1, a2, a3, b1, c1, c2] -> [a1, b1, c1, a2, c2, a3]
+    L'ordre relatif à l'intérieur d'un même préfixe est conservé.
+    """
+    groups: dict[Hashable, list[T]] = {}
+    for item in items:
+        groups.setdefault(key(item), []).append(item)
+
+    out: list[T] = []
+    queues = [iter(g) for g in groups.values()]
+    while queues:
+        still_active = []
+        for q in queues:
+            item = next(q, None)
+            if item is None:
+                continue
+            out.append(item)
+            still_active.append(q)
+        queues = still_active
+    return out
+
+
+class Deadline:
+    """Échéance globale ; seconds=None : pas d'échéance."""
+
+    def __init__(self, seconds: float | None) -> None:
+        self.end = time.monotonic() + seconds if seconds else None
+
+    def remaining(self) -> float:
+        if self.end is None:
+            return float("inf")
+        return max(self.end - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return self.end is not None and time.monotonic() >= self.end
+
+    def timeout(self, base: float) -> float:
+        """Délai à appliquer à une sonde : base, réduit quand l'échéance approche."""
+        if self.end is None:
+            return base
+        return max(MIN_PROBE_TIMEOUT_S, min(base, self.remaining() * DEADLINE_TIMEOUT_SHARE))
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Mesure de latence ICMP par lots (--ping-count N).
+
+Au lieu d'un `ping -c N` par cible (N secondes chacun), un seul
+échantillonneur envoie N échos à chaque cible, entrelacés : tour 1 vers
+toutes les cibles, puis tour 2... Le temps total est celui d'un ping de
+N paquets, pas N fois le nombre de cibles.
+
+- Socket ICMP "ping" non privilégié (SOCK_DGRAM, Linux, selon
+  net.ipv4.ping_group_range), sinon socket brut (root / CAP_NET_RAW).
+- Les réponses sont associées à leur écho par (adresse source, numéro de séquence).
+- Sans socket ICMP pour la famille de l'adresse (IPv6 seul refusé...), ou
+  pour un nom non résolu : repli sur `ping -c N` et lecture de sa sortie (ping_stats).
+
+Colonnes par cible : ping (OK si au moins une réponse), ping_loss_pct,
+rtt_min_ms, rtt_avg_ms, rtt_max_ms, rtt_jitter_ms (écart moyen entre
+deux RTT successifs).
+"""
+
+from __future__ import annotations
+
+import os
+import platform
+import re
+import selectors
+import socket
+import struct
+import subprocess
+import threading
+import time
+from typing import Callable
+
+from synscan import checksum
+from targets import group_by_address, pack_ip
+
+PING_INTERVAL_S = 0.2     # écart minimal entre deux tours
+PAYLOAD = b"diag_network-ping"
+
+ECHO_REQUEST = {socket.AF_INET: 8, socket.AF_INET6: 128}
+ECHO_REPLY = {socket.AF_INET: 0, socket.AF_INET6: 129}
+PROTO = {socket.AF_INET: socket.IPPROTO_ICMP, socket.AF_INET6: socket.IPPROTO_ICMPV6}
+
+STATS_COLUMNS = ("ping_loss_pct", "rtt_min_ms", "rtt_avg_ms", "rtt_max_ms", "rtt_jitter_ms")
+
+
+def icmp_socket(family: int) -> socket.socket:
+    """Socket ICMP non privilégié si possible, sinon brut. PermissionError si aucun."""
+    for kind in (socket.SOCK_DGRAM, socket.SOCK_RAW):
+        try:
+            sock = socket.socket(family, kind, PROTO[family])
+        except OSError:
+            continue
+        sock.setblocking(False)
+        return sock
+    raise PermissionError("socket ICMP indisponible")
+
+
+def icmp_families() -> frozenset[int]:
+    """Familles d'adresses (AF_INET, AF_INET6) pour lesquelles un socket ICMP s'ouvre."""
+    families = set()
+    for family in (socket.AF_INET, socket.AF_INET6):
+        try:
+            icmp_socket(family).close()
+            families.add(family)
+        except PermissionError:
+            pass
+    return frozenset(families)
+
+
+def echo_request(family: int, ident: int, seq: int) -> bytes:
+    header = struct.pack("!BBHHH", ECHO_REQUEST[family], 0, 0, ident, seq)
+    if family == socket.AF_INET6:
+        return header + PAYLOAD  # checksum ICMPv6 calculé par le noyau
+    return struct.pack("!BBHHH", ECHO_REQUEST[family], 0, checksum(header + PAYLOAD), ident, seq) + PAYLOAD
+
+
+def parse_reply(sock: socket.socket, data: bytes) -> int | None:
+    """Retour : numéro de séquence d'une réponse d'écho, None pour tout autre paquet."""
+    family = sock.family
+    if family == socket.AF_INET and sock.type == socket.SOCK_RAW:
+        data = data[(data[0] & 0x0F) * 4:]  # le socket brut IPv4 rend l'en-tête IP
+    if len(data) < 8:
+        return None
+    kind, _, _, ident, seq = struct.unpack("!BBHHH", data[:8])
+    if kind != ECHO_REPLY[family]:
+        return None
+    # En SOCK_DGRAM le noyau impose son propre identifiant : on ne le vérifie qu'en brut
+    if sock.type == socket.SOCK_RAW and ident != os.getpid() & 0xFFFF:
+        return None
+    return seq
+
+
+def jitter(rtts: list[float]) -> float | None:
+    """Écart moyen entre deux RTT successifs (même calcul en repli `ping -c N`)."""
+    diffs = [abs(b - a) for a, b in zip(rtts, rtts[1:])]
+    return sum(diffs) / len(diffs) if diffs else (0.0 if rtts else None)
+
+
+def summarize(sent: int, rtts: list[float]) -> dict:
+    if not sent:
+        return {"ping": "SKIPPED", **{column: "" for column in STATS_COLUMNS}}
+    out = {"ping": "OK" if rtts else "KO", "ping_loss_pct": f"{(sent - len(rtts)) * 100 / sent:.1f}"}
+    if rtts:
+        out["rtt_min_ms"] = f"{min(rtts):.2f}"
+        out["rtt_avg_ms"] = f"{sum(rtts) / len(rtts):.2f}"
+        out["rtt_max_ms"] = f"{max(rtts):.2f}"
+        out["rtt_jitter_ms"] = f"{jitter(rtts):.2f}"
+    else:
+        out.update({column: "" for column in STATS_COLUMNS[1:]})
+    return out
+
+
+def ping_batch(
+    hosts: list[str],
+    count: int,
+    timeout: float,
+    acquire: Callable[[str], bool | None] | None = None,
+    deadline: float | None = None,
+    interval: float = PING_INTERVAL_S,
+) -> dict[str, dict]:
+    """
+    Envoie `count` échos à chaque hôte (des IP), tour par tour.
+    acquire(host) est appelé avant chaque envoi (cadencement optionnel) ;
+    s'il rend False, les échos restants ne partent pas.
+    Retour : {hôte: colonnes ping, ping_loss_pct, rtt_*} ; ping vaut SKIPPED
+    si aucun écho n'est parti, ERROR si la famille d'adresse n'a pas de socket ICMP
+    ou si tous les envois ont échoué.
+    Deux écritures d'une même adresse ("::1", "0::1") partagent les mêmes échos.
+    """
+    # Échos, envois et RTT par adresse binaire
+    packed, by_packed = group_by_address(hosts)
+    families = {p: socket.AF_INET6 if len(p) == 16 else socket.AF_INET for p in by_packed}
+
+    sockets: dict[int, socket.socket] = {}
+    for family in set(families.values()):
+        try:
+            sockets[family] = icmp_socket(family)
+        except PermissionError:
+            pass
+    targets = [p for p in by_packed if families[p] in sockets]
+    error = {"ping": "ERROR", **{column: "" for column in STATS_COLUMNS}}
+    if not targets:
+        return {host: dict(error) for host in packed}
+
+    selector = selectors.DefaultSelector()
+    for sock in sockets.values():
+        selector.register(sock, selectors.EVENT_READ)
+
+    ident = os.getpid() & 0xFFFF
+    sent = {p: 0 for p in targets}
+    failed = {p: 0 for p in targets}   # envois refusés (zone IPv6 inconnue...)
+    rtts: dict[bytes, list[float]] = {p: [] for p in targets}
+    pending: dict[tuple[bytes, int], float] = {}
+    lock = threading.Lock()
+    sent_done = threading.Event()
+    last_send = [time.monotonic()]
+
+    def sender() -> None:
+        seq = 0
+        start = time.monotonic()
+        try:
+            for round_ in range(count):
+                # Tours espacés d'au moins `interval` : un tour = un écho par cible
+                wait = start + round_ * interval - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                for p in targets:
+                    host = by_packed[p]
+                    if deadline is not None and time.monotonic() >= deadline:
+                        return
+                    if acquire is not None and acquire(host) is False:
+                        return
+                    seq = (seq + 1) & 0xFFFF
+                    family = families[p]
+                    with lock:
+                        pending[(p, seq)] = time.perf_counter()
+                    try:
+                        sockets[family].sendto(echo_request(family, ident, seq), (host, 0))
+                        sent[p] += 1
+                    except OSError:
+                        failed[p] += 1
+                        with lock:
+                            pending.pop((p, seq), None)
+                    last_send[0] = time.monotonic()
+        finally:
+            sent_done.set()
+
+    def drain(sock: socket.socket) -> None:
+        while True:
+            try:
+                data, addr = sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            now = time.perf_counter()
+            seq = parse_reply(sock, data)
+            if seq is None:
+                continue
+            source = pack_ip(addr[0])
+            with lock:
+                sent_at = pending.pop((source, seq), None)
+            if sent_at is not None and source in rtts:
+                rtts[source].append((now - sent_at) * 1000)
+
+    thread = threading.Thread(target=sender, name="ping-sender", daemon=True)
+    thread.start()
+
+    def listening() -> bool:
+        now = time.monotonic()
+        if deadline is not None and now >= deadline:
+            return False
+        if not sent_done.is_set():
+            return True
+        with lock:
+            if not pending:
+                return False  # toutes les réponses sont arrivées
+        return now < last_send[0] + timeout
+
+    try:
+        while listening():
+            for key, _ in selector.select(timeout=0.05):
+                drain(key.fileobj)
+    finally:
+        thread.join()
+        selector.close()
+        for sock in sockets.values():
+            sock.close()
+
+    # Résultats rendus sous chaque écriture de l'appelant
+    stats = {p: summarize(sent[p], rtts[p]) if sent[p] or not failed[p] else error for p in targets}
+    return {host: dict(stats[p]) if p in stats else dict(error) for host, p in packed.items()}
+
+
+# --- repli : ping système ----------------------------------------------------
+
+LOSS_RE = re.compile(r"(\d+(?:[.,]\d+)?)\s*%")
+UNIX_RTT_RE = re.compile(r"=\s*([\d.]+)/([\d.]+)/([\d.]+)(?:/[\d.]+)?\s*ms")
+# Une ligne par réponse : "time=0.045 ms" (iputils, BusyBox), "temps=10 ms" / "time<1ms" (Windows)
+REPLY_TIME_RE = re.compile(r"(?:time|temps)\s*([=<])\s*([\d.,]+)\s*ms", re.IGNORECASE)
+WINDOWS_RTT_RE = re.compile(r"=\s*(\d+)\s*ms\D+=\s*(\d+)\s*ms\D+=\s*(\d+)\s*ms")
+
+
+def parse_ping_output(output: str) -> dict:
+    """
+    Sortie de `ping -c N` (iputils, BusyBox, macOS) ou `ping -n N` (Windows).
+    Retour : colonnes ping_loss_pct, rtt_* ("" si absentes de la sortie).
+    """
+    out = {column: "" for column in STATS_COLUMNS}
+    # Gigue calculée sur les RTT de chaque réponse, comme l'échantillonneur
+    # (pas le mdev d'iputils, qui est un écart type)
+    rtts = [0.0 if op == "<" else float(value.replace(",", ".")) for op, value in REPLY_TIME_RE.findall(output)]
+    if rtts:
+        out["rtt_jitter_ms"] = f"{jitter(rtts):.2f}"
+
+    loss = LOSS_RE.search(output)
+    if loss:
+        out["ping_loss_pct"] = f"{float(loss.group(1).replace(',', '.')):.1f}"
+
+    m = UNIX_RTT_RE.search(output)
+    if m:
+        out["rtt_min_ms"], out["rtt_avg_ms"], out["rtt_max_ms"] = (f"{float(v):.2f}" for v in m.groups()[:3])
+        return out
+
+    m = WINDOWS_RTT_RE.search(output)
+    if m:
+        # Windows : Minimum, Maximum, Moyenne
+        low, high, avg = (float(v) for v in m.groups())
+        out["rtt_min_ms"], out["rtt_avg_ms"], out["rtt_max_ms"] = f"{low:.2f}", f"{avg:.2f}", f"{high:.2f}"
+    return out
+
+
+def ping_stats(host: str, count: int, timeout: float) -> dict:
+    """Repli sans socket ICMP : un `ping -c N` pour cette cible."""
+    try:
+        if "windows" in platform.system().lower():
+            cmd = ["ping", "-n", str(count), "-w", str(int(timeout * 1000)), host]
+        else:
+            cmd = ["ping", "-c", str(count), "-i", str(PING_INTERVAL_S), "-W", str(max(int(timeout), 1)), host]
+        r = subprocess.run(cmd, capture_output=True, text=True, timeout=count * PING_INTERVAL_S + timeout + 1)
+        out = parse_ping_output(r.stdout)
+        out["ping"] = "OK" if r.returncode == 0 else "KO"
+        return out
+    except subprocess.TimeoutExpired:
+        return {"ping": "KO", **{column: "" for column in STATS_COLUMNS}}
+    except Exception:
+        return {"ping": "ERROR", **{column: "" for column in STATS_COLUMNS}}
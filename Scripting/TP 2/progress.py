@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Progression en direct : cibles faites / total, sondes par seconde,
+sondes en cours par étape (ping, tcp, tls...) et temps restant estimé.
+
+Les threads de sondage ne font qu'incrémenter des compteurs ; l'affichage
+est fait par un thread à part, à fréquence limitée :
+- terminal : une ligne réécrite sur place (\\r) toutes les REFRESH_TTY_S ;
+- sortie redirigée (fichier, cron...) : une ligne de log toutes les LOG_INTERVAL_S.
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, TextIO
+
+REFRESH_TTY_S = 0.25
+LOG_INTERVAL_S = 30.0
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+class Progress:
+    def __init__(self, total: int, stream: TextIO | None = None) -> None:
+        self.total = total
+        self.stream = stream or sys.stdout
+        self.tty = self.stream.isatty()
+        self.interval = REFRESH_TTY_S if self.tty else LOG_INTERVAL_S
+
+        self.done = 0
+        self.probes = 0
+        self.in_flight: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        self._start = time.monotonic()
+        self._last_time = self._start
+        self._last_probes = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="progress", daemon=True)
+
+    # --- côté sondes : compteurs seulement ---------------------------------
+
+    @contextmanager
+    def stage(self, name: str, probes: int = 1) -> Iterator[None]:
+        with self._lock:
+            self.in_flight[name] = self.in_flight.get(name, 0) + 1
+            self.probes += probes
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight[name] -= 1
+
+    def add_probes(self, n: int = 1) -> None:
+        with self._lock:
+            self.probes += n
+
+    def target_done(self) -> None:
+        with self._lock:
+            self.done += 1
+
+    # --- côté affichage ----------------------------------------------------
+
+    def start(self) -> "Progress":
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._render()
+
+    def line(self) -> str:
+        now = time.monotonic()
+        with self._lock:
+            done, probes = self.done, self.probes
+            stages = " ".join(f"{k}={v}" for k, v in self.in_flight.items() if v)
+
+        rate = (probes - self._last_probes) / max(now - self._last_time, 1e-6)
+        self._last_time, self._last_probes = now, probes
+
+        elapsed = now - self._start
+        if done:
+            eta = format_duration(elapsed / done * (self.total - done))
+        else:
+            eta = "--:--:--"
+        percent = done * 100 / self.total if self.total else 100.0
+        return (
+            f"[{done}/{self.total}] {percent:5.1f}% | {rate:7.1f} sondes/s | "
+            f"en cours: {stages or '-'} | ETA {eta}"
+        )
+
+    def _render(self) -> None:
+        if self.tty:
+            self.stream.write("\r\033[K" + self.line())
+        else:
+            self.stream.write(time.strftime("%H:%M:%S ") + self.line() + "\n")
+        self.stream.flush()
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._stop.set()
+            self._thread.join()
+            self._render()
+            if self.tty:
+                self.stream.write("\n")
+                self.stream.flush()
+
+    def __enter__(self) -> "Progress":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Résolution inverse (PTR) en masse.
+
+- les recherches tournent dans un pool borné, en parallèle des sondes ;
+  ses threads sont des démons : une recherche bloquée dans
+  gethostbyaddr ne retarde pas la fin du programme (--deadline) ;
+- à la fin du scan on n'attend que PTR_GRACE_S au maximum : une adresse
+  sans réponse à ce moment-là reste vide (sans être mise en cache) ;
+- les réponses positives ET négatives sont mises en cache avec un TTL.
+"""
+
+from __future__ import annotations
+
+import queue
+import socket
+import threading
+import time
+from concurrent.futures import Future, wait
+
+PTR_WORKERS = 16
+PTR_GRACE_S = 1.0
+POSITIVE_TTL_S = 3600
+NEGATIVE_TTL_S = 300
+
+
+class PtrCache:
+    """Cache ip -> nom ("" = pas de PTR), partagé entre threads."""
+
+    def __init__(self, positive_ttl: float = POSITIVE_TTL_S, negative_ttl: float = NEGATIVE_TTL_S) -> None:
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self._entries: dict[str, tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, ip: str) -> str | None:
+        """Retour : le nom, "" si réponse négative en cache, None si absent/expiré."""
+        with self._lock:
+            entry = self._entries.get(ip)
+            if entry is None:
+                return None
+            name, expires = entry
+            if expires < time.monotonic():
+                del self._entries[ip]
+                return None
+            return name
+
+    def put(self, ip: str, name: str) -> None:
+        ttl = self.positive_ttl if name else self.negative_ttl
+        with self._lock:
+            self._entries[ip] = (name, time.monotonic() + ttl)
+
+
+def reverse_dns(ip: str) -> str:
+    try:
+        return socket.gethostbyaddr(ip)[0]
+    except (socket.herror, socket.gaierror, OSError):
+        return ""
+
+
+class BulkPtr:
+    """
+    start(ips) lance les recherches manquantes en arrière-plan,
+    collect() rend {ip: nom} en attendant au plus `grace` secondes.
+    """
+
+    def __init__(self, cache: PtrCache, workers: int = PTR_WORKERS, grace: float = PTR_GRACE_S) -> None:
+        self.cache = cache
+        self.grace = grace
+        # Pas de ThreadPoolExecutor : ses threads sont attendus à la sortie du programme
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"ptr_{i}", daemon=True) for i in range(workers)
+        ]
+        self._futures: dict[str, Future] = {}
+        self._results: dict[str, str] = {}
+
+    def _lookup(self, ip: str) -> str:
+        name = reverse_dns(ip)
+        self.cache.put(ip, name)
+        return name
+
+    def _worker(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            ip, future = item
+            if not future.set_running_or_notify_cancel():
+                continue  # annulée par collect()
+            try:
+                future.set_result(self._lookup(ip))
+            except Exception as e:
+                future.set_exception(e)
+
+    def start(self, ips: list[str]) -> None:
+        for ip in dict.fromkeys(ips):
+            cached = self.cache.get(ip)
+            if cached is not None:
+                self._results[ip] = cached
+            elif ip not in self._futures:
+                future: Future = Future()
+                self._futures[ip] = future
+                self._queue.put((ip, future))
+        if self._futures and not self._threads[0].is_alive():
+            for thread in self._threads:
+                thread.start()
+
+    def collect(self, grace: float | None = None) -> dict[str, str]:
+        if self._futures:
+            wait(self._futures.values(), timeout=self.grace if grace is None else grace)
+        for ip, future in self._futures.items():
+            self._results[ip] = future.result() if future.done() and not future.cancelled() else ""
+        # Les recherches encore en vol finissent en arrière-plan et alimentent le cache ;
+        # celles pas encore commencées sont abandonnées
+        for future in self._futures.values():
+            future.cancel()
+        for _ in self._threads:
+            self._queue.put(None)
+        return self._results
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Sorties du rapport (--format csv|jsonl|sqlite).
+
+Chaque sortie s'utilise de la même façon :
+
+    with open_sink("sqlite", path, fieldnames) as sink:
+        for row in rows:
+            sink.write(row)
+
+- csv    : csv.DictWriter, comme avant
+- jsonl  : une ligne JSON par cible, écrite au fil de l'eau
+- sqlite : table "report", insertions par lots (executemany) dans une
+           transaction, index sur target et sur les colonnes de statut
+
+csv et jsonl peuvent être compressés à la volée (--compress gzip|zstd,
+zstd si le module zstandard est installé) et découpés en parties de
+taille fixe (--rotate-mb) : report-g000001-0001.csv.gz, report-g000001-0002.csv.gz...
+listées dans report.csv.manifest.json.
+
+Toute sortie est écrite dans un fichier .tmp renommé à la fermeture
+(os.replace). Avec des parties, chaque écriture du rapport est une
+nouvelle génération (gNNNNNN dans le nom) : les parties de la
+génération précédente, listées par l'ancien manifeste, restent
+intactes jusqu'à ce que le nouveau manifeste les remplace ; elles sont
+supprimées ensuite. Un lecteur ne voit jamais un rapport à moitié écrit.
+Si le bloc `with` lève une exception (Ctrl+C...), rien n'est renommé :
+les .tmp et les parties déjà écrites sont supprimés, l'ancien rapport reste.
+"""
+
+from __future__ import annotations
+
+import csv
+import gzip
+import io
+import json
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import BinaryIO
+
+try:
+    import zstandard
+except ImportError:  # zstd indisponible, gzip reste possible
+    zstandard = None
+
+WRITE_BUFFER = 1 << 20
+SQLITE_BATCH = 1000
+SQLITE_TABLE = "report"
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+SUFFIXES = {"csv": ".csv", "jsonl": ".jsonl", "sqlite": ".db"}
+COMPRESSIONS = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+
+def is_status_column(name: str) -> bool:
+    return name == "ping" or name.startswith(("tcp_", "udp_"))
+
+
+def tmp_path(path: Path) -> Path:
+    return path.with_name(path.name + ".tmp")
+
+
+def manifest_path(path: Path) -> Path:
+    """report.csv -> report.csv.manifest.json"""
+    return path.with_name(path.name + ".manifest.json")
+
+
+def write_atomic(path: Path, text: str) -> None:
+    tmp = tmp_path(path)
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+class PartWriter:
+    """
+    Flux texte compressé à la volée, découpé en parties d'environ `part_bytes`
+    octets sur disque (0 = un seul fichier). Chaque partie reçoit `header`.
+    """
+
+    def __init__(self, path: Path, compress: str = "none", part_bytes: int = 0, header: str = "") -> None:
+        if compress == "zstd" and zstandard is None:
+            raise RuntimeError("compression zstd : module zstandard non installé")
+        self.path = path
+        self.compress = compress
+        self.part_bytes = part_bytes
+        self.header = header
+        self.parts: list[dict] = []
+        self._previous = self._read_manifest() if part_bytes else {}
+        self.generation = int(self._previous.get("generation", 0)) + 1
+        self._raw: BinaryIO | None = None
+        self._compressor: BinaryIO | None = None
+        self._text: io.TextIOWrapper | None = None
+        self._on_disk = 0      # taille de la partie à la dernière mesure
+        self._unmeasured = 0   # caractères écrits depuis
+
+    def _part_path(self) -> Path:
+        suffix = COMPRESSIONS[self.compress]
+        if not self.part_bytes:
+            return self.path.with_name(self.path.name + suffix)
+        stem, ext = self.path.name.split(".", 1)
+        return self.path.with_name(f"{stem}-g{self.generation:06d}-{len(self.parts) + 1:04d}.{ext}{suffix}")
+
+    def _open_part(self) -> None:
+        path = self._part_path()
+        self.parts.append({"file": path.name, "rows": 0, "bytes": 0})
+        self._raw = tmp_path(path).open("wb", buffering=WRITE_BUFFER)
+        if self.compress == "gzip":
+            # mtime=0 : même contenu -> même fichier compressé
+            stream = gzip.GzipFile(fileobj=self._raw, mode="wb", compresslevel=GZIP_LEVEL, mtime=0)
+        elif self.compress == "zstd":
+            stream = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(self._raw, closefd=False)
+        else:
+            stream = self._raw
+        self._compressor = stream
+        # Gros tampon devant le compresseur : peu d'appels, de gros blocs
+        if stream is not self._raw:
+            stream = io.BufferedWriter(stream, buffer_size=WRITE_BUFFER)
+        self._text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+        self._text.write(self.header)
+        self._on_disk, self._unmeasured = 0, len(self.header)
+
+    def _measure(self) -> int:
+        """Taille réelle de la partie : tampons et compresseur vidés (coûteux, appel rare)."""
+        self._text.flush()
+        if self._compressor is not self._raw:
+            self._compressor.flush()  # gzip : Z_SYNC_FLUSH ; zstd : fin de bloc
+        self._on_disk, self._unmeasured = self._raw.tell(), 0
+        return self._on_disk
+
+    def _close_stream(self) -> None:
+        self._text.close()
+        if not self._raw.closed:
+            self._raw.close()
+
+    def _close_part(self) -> None:
+        self._close_stream()
+        path = self.path.with_name(self.parts[-1]["file"])
+        self.parts[-1]["bytes"] = tmp_path(path).stat().st_size
+        os.replace(tmp_path(path), path)
+        self._text = self._raw = self._compressor = None
+
+    def write_row(self, text: str) -> None:
+        if self._text is None:
+            self._open_part()
+        elif self.part_bytes and self._unmeasured >= self.part_bytes - self._on_disk:
+            # Compressé, le texte écrit depuis la dernière mesure ne prend pas plus de
+            # place que non compressé : on ne mesure (et ne vide les tampons) que
+            # lorsqu'il a pu faire atteindre la taille cible
+            if self._measure() >= self.part_bytes:
+                self._close_part()
+                self._open_part()
+        self._text.write(text)
+        self._unmeasured += len(text)
+        self.parts[-1]["rows"] += 1
+
+    def close(self) -> None:
+        if self._text is None:
+            self._open_part()  # rapport vide : on écrit quand même l'en-tête
+        self._close_part()
+        if self.part_bytes:
+            self._write_manifest()
+
+    def abort(self) -> None:
+        """Écriture interrompue : ni renommage ni manifeste, l'ancien rapport reste en place."""
+        done = self.parts
+        if self._text is not None:
+            self._close_stream()
+            tmp_path(self.path.with_name(self.parts[-1]["file"])).unlink(missing_ok=True)
+            self._text = self._raw = self._compressor = None
+            done = self.parts[:-1]
+        if self.part_bytes:
+            # Parties de la nouvelle génération déjà renommées : aucun manifeste ne les cite
+            for part in done:
+                self.path.with_name(part["file"]).unlink(missing_ok=True)
+
+    def _read_manifest(self) -> dict:
+        try:
+            manifest = json.loads(manifest_path(self.path).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return manifest if isinstance(manifest, dict) else {}
+
+    def _write_manifest(self) -> None:
+        write_atomic(manifest_path(self.path), json.dumps({
+            "generation": self.generation,
+            "compression": self.compress,
+            "rows": sum(part["rows"] for part in self.parts),
+            "parts": self.parts,
+        }, indent=2))
+
+        # Le nouveau manifeste est en place : la génération précédente ne sert plus
+        current = {part["file"] for part in self.parts}
+        for part in self._previous.get("parts", []):
+            name = part.get("file") if isinstance(part, dict) else None
+            if name and name not in current:
+                self.path.with_name(name).unlink(missing_ok=True)
+
+
+class Sink(ABC):
+    """Une sortie à laquelle il manque une méthode ne peut pas être créée (TypeError)."""
+
+    @abstractmethod
+    def write(self, row: dict) -> None: ...
+
+    @abstractmethod
+    def close(self) -> None: ...
+
+    @abstractmethod
+    def abort(self) -> None: ...
+
+    def __enter__(self) -> "Sink":
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        # Rapport mis en place seulement si le bloc `with` s'est terminé normalement
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class _LineBuffer:
+    """Cible de csv.writer : garde la dernière ligne formatée."""
+
+    def __init__(self) -> None:
+        self.line = ""
+
+    def write(self, text: str) -> None:
+        self.line = text
+
+
+class CsvSink(Sink):
+    def __init__(self, path: Path, fieldnames: list[str], compress: str = "none", part_bytes: int = 0) -> None:
+        self._line = _LineBuffer()
+        self._writer = csv.DictWriter(self._line, fieldnames=fieldnames)
+        self._writer.writeheader()
+        self._out = PartWriter(path, compress, part_bytes, header=self._line.line)
+
+    def write(self, row: dict) -> None:
+        self._writer.writerow(row)
+        self._out.write_row(self._line.line)
+
+    def close(self) -> None:
+        self._out.close()
+
+    def abort(self) -> None:
+        self._out.abort()
+
+
+class JsonlSink(Sink):
+    def __init__(self, path: Path, fieldnames: list[str], compress: str = "none", part_bytes: int = 0) -> None:
+        self._out = PartWriter(path, compress, part_bytes)
+        self._fieldnames = fieldnames
+        self._encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+    def write(self, row: dict) -> None:
+        self._out.write_row(self._encode({k: row.get(k, "") for k in self._fieldnames}) + "\n")
+
+    def close(self) -> None:
+        self._out.close()
+
+    def abort(self) -> None:
+        self._out.abort()
+
+
+class SqliteSink(Sink):
+    """Base SQLite : ni compression ni découpage (elle doit rester interrogeable)."""
+
+    def __init__(self, path: Path, fieldnames: list[str], compress: str = "none", part_bytes: int = 0) -> None:
+        self._path = path
+        self._fieldnames = fieldnames
+        self._batch: list[tuple] = []
+        tmp_path(path).unlink(missing_ok=True)
+        self._db = sqlite3.connect(tmp_path(path))
+        self._db.execute("PRAGMA synchronous=NORMAL")
+
+        columns = ", ".join(f'"{name}" TEXT' for name in fieldnames)
+        with self._db:
+            self._db.execute(f'CREATE TABLE "{SQLITE_TABLE}" ({columns})')
+
+        placeholders = ", ".join("?" for _ in fieldnames)
+        self._insert = f'INSERT INTO "{SQLITE_TABLE}" VALUES ({placeholders})'
+
+    def write(self, row: dict) -> None:
+        self._batch.append(tuple(row.get(k, "") for k in self._fieldnames))
+        if len(self._batch) >= SQLITE_BATCH:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._batch:
+            with self._db:  # une transaction par lot
+                self._db.executemany(self._insert, self._batch)
+            self._batch.clear()
+
+    def close(self) -> None:
+        self._flush()
+        # Index créés après l'insertion : plus rapide que de les maintenir ligne à ligne
+        indexed = [name for name in self._fieldnames if name == "target" or is_status_column(name)]
+        with self._db:
+            for name in indexed:
+                self._db.execute(f'CREATE INDEX "idx_{SQLITE_TABLE}_{name}" ON "{SQLITE_TABLE}" ("{name}")')
+        self._db.close()
+        os.replace(tmp_path(self._path), self._path)
+
+    def abort(self) -> None:
+        self._db.close()
+        tmp_path(self._path).unlink(missing_ok=True)
+
+
+SINKS = {"csv": CsvSink, "jsonl": JsonlSink, "sqlite": SqliteSink}
+
+
+def open_sink(fmt: str, path: Path, fieldnames: list[str], compress: str = "none", part_bytes: int = 0) -> Sink:
+    return SINKS[fmt](path, fieldnames, compress, part_bytes)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Scan TCP "semi-ouvert" (SYN scan) pour remplacer test_tcp en mode --syn.
+
+On envoie un SYN brut et on classe la réponse sans terminer la poignée
+de main (pas de close, pas de TIME_WAIT, pas de port éphémère consommé) :
+- SYN-ACK      -> OPEN
+- RST          -> CLOSED
+- pas de réponse dans le délai -> FILTERED
+
+Nécessite un socket brut (root ou CAP_NET_RAW), IPv4 uniquement.
+Les sondes en cours sont rangées dans une table indexée par
+(ip, port, seq) ; un thread unique lit les réponses et réveille
+le thread qui attend.
+"""
+
+from __future__ import annotations
+
+import random
+import socket
+import struct
+import threading
+
+TCP_FIN_SYN_RST_ACK = 0x17
+TCP_SYN = 0x02
+TCP_RST = 0x04
+TCP_SYN_ACK = 0x12
+
+SOURCE_PORTS = (32768, 60999)
+
+
+def checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    while total >> 16:
+        total = (total & 0xFFFF) + (total >> 16)
+    return ~total & 0xFFFF
+
+
+def build_syn(src_ip: str, dst_ip: str, sport: int, dport: int, seq: int) -> bytes:
+    """Segment TCP SYN (avec option MSS) ; l'en-tête IP est ajouté par le noyau."""
+    options = struct.pack("!BBH", 2, 4, 1460)
+    offset = (5 + len(options) // 4) << 4
+    header = struct.pack("!HHIIBBHHH", sport, dport, seq, 0, offset, TCP_SYN, 1024, 0, 0) + options
+
+    pseudo = struct.pack(
+        "!4s4sBBH",
+        socket.inet_aton(src_ip),
+        socket.inet_aton(dst_ip),
+        0,
+        socket.IPPROTO_TCP,
+        len(header),
+    )
+    csum = checksum(pseudo + header)
+    return header[:16] + struct.pack("!H", csum) + header[18:]
+
+
+def source_ip_for(dst_ip: str) -> str:
+    """Adresse locale choisie par la table de routage pour joindre dst_ip."""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.connect((dst_ip, 9))
+        return s.getsockname()[0]
+
+
+class _Probe:
+    __slots__ = ("sport", "event", "status")
+
+    def __init__(self, sport: int) -> None:
+        self.sport = sport
+        self.event = threading.Event()
+        self.status = "FILTERED"
+
+
+class SynScanner:
+    """
+    Utilisable depuis plusieurs threads : scan() bloque l'appelant
+    jusqu'à la réponse ou l'expiration du délai.
+    Lève PermissionError à la création sans CAP_NET_RAW.
+    """
+
+    def __init__(self, timeout: float) -> None:
+        self.timeout = timeout
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_TCP)
+        self._sock.settimeout(0.2)
+        self._pending: dict[tuple[str, int, int], _Probe] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._reader = threading.Thread(target=self._read_loop, name="synscan-reader", daemon=True)
+        self._reader.start()
+
+    def scan(self, host: str, port: int, timeout: float | None = None) -> str:
+        try:
+            socket.inet_aton(host)
+        except OSError:
+            return "ERROR"
+
+        sport = random.randint(*SOURCE_PORTS)
+        seq = random.getrandbits(32)
+        key = (host, port, seq)
+        probe = _Probe(sport)
+
+        with self._lock:
+            self._pending[key] = probe
+        try:
+            segment = build_syn(source_ip_for(host), host, sport, port, seq)
+            self._sock.sendto(segment, (host, 0))
+            probe.event.wait(timeout or self.timeout)
+            return probe.status
+        except OSError:
+            return "ERROR"
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def _read_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                packet = self._sock.recv(65535)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            self._handle(packet)
+
+    def _handle(self, packet: bytes) -> None:
+        ihl = (packet[0] & 0x0F) * 4
+        if len(packet) < ihl + 20:
+            return
+        src_ip = socket.inet_ntoa(packet[12:16])
+        sport, dport, _seq, ack = struct.unpack("!HHII", packet[ihl:ihl + 12])
+        flags = packet[ihl + 13] & TCP_FIN_SYN_RST_ACK
+
+        if flags & TCP_SYN_ACK == TCP_SYN_ACK:
+            status = "OPEN"
+        elif flags & TCP_RST:
+            status = "CLOSED"
+        else:
+            return
+
+        with self._lock:
+            probe = self._pending.get((src_ip, sport, (ack - 1) & 0xFFFFFFFF))
+        if probe is None or probe.sport != dport:
+            return
+        probe.status = status
+        probe.event.set()
+
+    def close(self) -> None:
+        self._stop.set()
+        self._reader.join()
+        self._sock.close()
+
+    def __enter__(self) -> "SynScanner":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
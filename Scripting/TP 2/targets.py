@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Classification des cibles (IP / DNS) sans passer par une exception.
+
+is_ip() historique construit un ipaddress.ip_address et attrape
+ValueError pour chaque nom DNS : c'est le cas le plus fréquent, et le
+plus lent. Ici :
+- un motif précompilé reconnaît les IPv4 (sans zéros en tête, comme
+  ipaddress) ; inet_pton ne sert qu'à produire la forme binaire ;
+- inet_pton(AF_INET6) n'est tenté que sur les chaînes qui ressemblent
+  à une IPv6 (présence de ":" et uniquement des caractères hexa) ;
+- les noms DNS sont normalisés : minuscules, sans point final, IDNA ;
+- classify_targets() traite un lot et ne classe qu'une fois chaque valeur.
+
+L'adresse binaire (4 ou 16 octets) est transmise telle quelle au
+cadencement (pacing.prefix_key) pour éviter de la reparser par paquet.
+
+read_targets() lit targets.txt avec des étiquettes optionnelles :
+    core-router-1 #prio=1
+    # ligne de commentaire
+prio : 1 = le plus urgent ; sans étiquette, DEFAULT_PRIO.
+"""
+
+from __future__ import annotations
+
+import re
+import socket
+from pathlib import Path
+from typing import Iterable, NamedTuple
+
+DEFAULT_PRIO = 5
+
+_OCTET = r"(?:25[0-5]|2[0-4][0-9]|1[0-9][0-9]|[1-9]?[0-9])"  # [0-9] : \d accepte aussi "١"
+IPV4_RE = re.compile(rf"{_OCTET}(?:\.{_OCTET}){{3}}")
+IPV6_CHARS_RE = re.compile(r"[0-9A-Fa-f:.]+")
+SCOPE_RE = re.compile(r"[0-9A-Za-z_.-]+")  # "%eth0", "%2" d'une adresse IPv6 de lien local
+
+
+class Target(NamedTuple):
+    raw: str             # valeur lue dans le fichier
+    kind: str            # "IP" ou "DNS"
+    name: str            # IP telle quelle (zone IPv6 comprise), ou nom DNS normalisé
+    packed: bytes | None  # forme binaire si IP, sinon None
+
+
+def pack_ip(value: str) -> bytes | None:
+    """
+    Retour : l'adresse en binaire (4 ou 16 octets), None si ce n'est pas une IP.
+    Le suffixe de zone IPv6 ("fe80::1%eth0") n'entre pas dans la forme binaire.
+    """
+    address, percent, scope = value.partition("%")
+    try:
+        if IPV4_RE.fullmatch(value):
+            return socket.inet_pton(socket.AF_INET, value)
+        if ":" in address and IPV6_CHARS_RE.fullmatch(address) and (not percent or SCOPE_RE.fullmatch(scope)):
+            return socket.inet_pton(socket.AF_INET6, address)
+    except OSError:
+        return None
+    return None
+
+
+def group_by_address(hosts: Iterable[str]) -> tuple[dict[str, bytes | None], dict[bytes, str]]:
+    """
+    Plusieurs écritures d'une même adresse ("::1", "0::1", "::1%lo") : une seule sonde.
+    Retour : ({écriture: adresse binaire ou None}, {adresse binaire: écriture à sonder}),
+    l'écriture à sonder étant la première sans zone IPv6 (que le système peut refuser).
+    """
+    packed = {host: pack_ip(host) for host in dict.fromkeys(hosts)}
+    by_packed: dict[bytes, str] = {}
+    for host, p in packed.items():
+        if p is not None and (p not in by_packed or "%" in by_packed[p] and "%" not in host):
+            by_packed[p] = host
+    return packed, by_packed
+
+
+def normalize_hostname(name: str) -> str:
+    name = name.strip().rstrip(".").lower()
+    if not name.isascii():
+        try:
+            name = name.encode("idna").decode("ascii")
+        except UnicodeError:
+            pass  # on garde le nom tel quel, la résolution échouera proprement
+    return name
+
+
+def classify(value: str) -> Target:
+    packed = pack_ip(value)
+    if packed is not None:
+        return Target(value, "IP", value, packed)
+    return Target(value, "DNS", normalize_hostname(value), None)
+
+
+def classify_targets(values: Iterable[str]) -> list[Target]:
+    cache: dict[str, Target] = {}
+    out = []
+    for value in values:
+        target = cache.get(value)
+        if target is None:
+            target = cache[value] = classify(value)
+        out.append(target)
+    return out
+
+
+def parse_target_line(line: str) -> tuple[str, int] | None:
+    """Retour : (cible, priorité), None pour une ligne vide ou de commentaire."""
+    value, _, comment = line.partition("#")
+    value = value.strip()
+    if not value:
+        return None
+
+    prio = DEFAULT_PRIO
+    for tag in comment.replace("#", " ").split():
+        key, _, raw = tag.partition("=")
+        if key == "prio" and raw.isascii() and raw.isdigit():  # isdigit() seul accepte "²"
+            prio = int(raw)
+    return value, prio
+
+
+def read_targets(path: Path) -> list[tuple[str, int]]:
+    entries = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        entry = parse_target_line(line)
+        if entry is not None:
+            entries.append(entry)
+    return entries
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Sonde TLS : poignée de main sur un port (443 par défaut) et relevé de
+- la version négociée (TLSv1.2, TLSv1.3...)
+- la latence de la poignée de main en ms
+- le sujet et la date d'expiration du certificat
+
+Le certificat n'est PAS validé (on diagnostique, on n'authentifie pas) ;
+il est décodé ici en DER, et le résultat est mis en cache par empreinte
+SHA-256 : un certificat partagé (CDN) n'est décodé qu'une fois.
+Les sessions TLS (tickets) sont gardées par (hôte, port, SNI) et
+réutilisées lors d'un nouveau scan dans le même processus.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import socket
+import ssl
+import threading
+import time
+
+TICKET_WAIT_S = 0.05
+
+# OID (forme DER) -> abréviation utilisée dans le sujet
+NAME_OIDS = {
+    b"\x55\x04\x03": "CN",
+    b"\x55\x04\x06": "C",
+    b"\x55\x04\x07": "L",
+    b"\x55\x04\x08": "ST",
+    b"\x55\x04\x0a": "O",
+    b"\x55\x04\x0b": "OU",
+}
+
+
+def _tlv(data: bytes, pos: int) -> tuple[int, int, int]:
+    """Lit un élément DER. Retour : (tag, début de la valeur, fin de la valeur)."""
+    tag = data[pos]
+    length = data[pos + 1]
+    pos += 2
+    if length & 0x80:
+        n = length & 0x7F
+        length = int.from_bytes(data[pos:pos + n], "big")
+        pos += n
+    return tag, pos, pos + length
+
+
+def _children(data: bytes, start: int, end: int) -> list[tuple[int, int, int]]:
+    out = []
+    while start < end:
+        tag, vstart, vend = _tlv(data, start)
+        out.append((tag, vstart, vend))
+        start = vend
+    return out
+
+
+def _decode_string(tag: int, raw: bytes) -> str:
+    if tag == 0x1E:  # BMPString
+        return raw.decode("utf-16-be", errors="replace")
+    return raw.decode("utf-8", errors="replace")
+
+
+def _decode_time(tag: int, raw: bytes) -> str:
+    text = raw.decode("ascii", errors="replace").rstrip("Z")
+    if tag == 0x17:  # UTCTime : AAMMJJhhmmss
+        year = int(text[:2])
+        text = f"{1900 + year if year >= 50 else 2000 + year}{text[2:]}"
+    return f"{text[0:4]}-{text[4:6]}-{text[6:8]}T{text[8:10]}:{text[10:12]}:{text[12:14]}Z"
+
+
+def parse_certificate(der: bytes) -> tuple[str, str]:
+    """Retour : (sujet au format /C=../O=../CN=.., expiration ISO 8601 UTC)."""
+    _, cstart, cend = _tlv(der, 0)
+    _, tstart, tend = _children(der, cstart, cend)[0]
+    fields = _children(der, tstart, tend)
+    if fields[0][0] == 0xA0:  # [0] version, optionnel
+        fields = fields[1:]
+    # serial, signature, issuer, validity, subject
+    validity, subject = fields[3], fields[4]
+
+    not_after = _children(der, validity[1], validity[2])[1]
+    expiry = _decode_time(not_after[0], der[not_after[1]:not_after[2]])
+
+    parts = []
+    for _, rstart, rend in _children(der, subject[1], subject[2]):
+        for _, astart, aend in _children(der, rstart, rend):
+            oid, value = _children(der, astart, aend)[:2]
+            name = NAME_OIDS.get(der[oid[1]:oid[2]])
+            if name:
+                parts.append(f"/{name}={_decode_string(value[0], der[value[1]:value[2]])}")
+    return "".join(parts), expiry
+
+
+class CertCache:
+    """Empreinte SHA-256 -> (sujet, expiration)."""
+
+    def __init__(self) -> None:
+        self._parsed: dict[bytes, tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, der: bytes) -> tuple[str, str]:
+        fingerprint = hashlib.sha256(der).digest()
+        with self._lock:
+            cached = self._parsed.get(fingerprint)
+        if cached is None:
+            try:
+                cached = parse_certificate(der)
+            except (IndexError, ValueError):
+                cached = ("", "")
+            with self._lock:
+                self._parsed[fingerprint] = cached
+        return cached
+
+
+class TlsProber:
+    def __init__(self, timeout: float) -> None:
+        self.timeout = timeout
+        self.certs = CertCache()
+        self._sessions: dict[tuple[str, int, str | None], ssl.SSLSession] = {}
+        self._lock = threading.Lock()
+        self._context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        self._context.check_hostname = False
+        self._context.verify_mode = ssl.CERT_NONE
+
+    def handshake(
+        self,
+        raw: socket.socket,
+        host: str,
+        port: int,
+        sni: str | None = None,
+        timeout: float | None = None,
+    ) -> tuple[dict, ssl.SSLSocket | None]:
+        """
+        Poignée de main sur une connexion TCP déjà ouverte (par test_tcp).
+        Retour : (colonnes tls_*, socket TLS laissé ouvert ou None si échec).
+        """
+        out = {"tls_version": "ERROR", "tls_ms": "", "tls_subject": "", "tls_expiry": ""}
+        key = (host, port, sni)
+        with self._lock:
+            session = self._sessions.get(key)
+
+        try:
+            raw.settimeout(timeout or self.timeout)
+            start = time.perf_counter()
+            tls = self._context.wrap_socket(raw, server_hostname=sni, session=session)
+        except (ssl.SSLError, OSError):
+            raw.close()
+            return out, None
+
+        try:
+            out["tls_ms"] = f"{(time.perf_counter() - start) * 1000:.1f}"
+            out["tls_version"] = tls.version() or ""
+
+            der = tls.getpeercert(binary_form=True)
+            if der:
+                out["tls_subject"], out["tls_expiry"] = self.certs.lookup(der)
+
+            if not tls.session_reused:
+                self._remember_session(key, tls)
+        except (ssl.SSLError, OSError):
+            tls.close()
+            return out, None
+        return out, tls
+
+    def _remember_session(self, key: tuple[str, int, str | None], tls: ssl.SSLSocket) -> None:
+        # En TLS 1.3 le ticket arrive après la poignée de main : on le laisse arriver
+        if tls.version() == "TLSv1.3":
+            tls.settimeout(TICKET_WAIT_S)
+            try:
+                tls.recv(1)
+            except (socket.timeout, ssl.SSLError, OSError):
+                pass
+        session = tls.session
+        if session is not None and session.has_ticket:
+            with self._lock:
+                self._sessions[key] = session
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Sondes UDP par lots (DNS 53, NTP 123, SNMP 161).
+
+Contrairement à TCP, un port UDP ne répond qu'à une requête valide :
+on envoie donc une charge utile conforme au protocole du port.
+Toutes les sondes partent de quelques sockets non connectés ;
+les réponses sont associées à leur sonde par l'adresse source (ip, port),
+comparée sous forme binaire : "0:0::1" et "::1" sont la même sonde.
+
+Retour par (ip, port) :
+- OPEN     : réponse reçue
+- CLOSED   : ICMP "port unreachable" reçu (Linux, via IP_RECVERR)
+- FILTERED : aucune réponse dans le délai (port filtré ou service muet)
+- ERROR    : envoi impossible
+- SKIPPED  : non envoyée, l'échéance globale (deadline) est dépassée
+"""
+
+from __future__ import annotations
+
+import errno
+import random
+import selectors
+import socket
+import struct
+import threading
+import time
+from typing import Callable
+
+from targets import group_by_address, pack_ip
+
+SOCKETS_PER_FAMILY = 4
+
+# Constantes Linux absentes du module socket
+IP_RECVERR = getattr(socket, "IP_RECVERR", 11)
+IPV6_RECVERR = getattr(socket, "IPV6_RECVERR", 25)
+SOCK_EE_FORMAT = "=IBBBBII"  # struct sock_extended_err
+
+
+def _tlv(tag: int, value: bytes) -> bytes:
+    # Encodage BER minimal (longueurs < 128 uniquement)
+    return bytes([tag, len(value)]) + value
+
+
+def dns_query() -> bytes:
+    """Requête DNS "NS ." : un résolveur répond, un serveur autoritaire répond REFUSED."""
+    txid = random.getrandbits(16)
+    return struct.pack("!HHHHHH", txid, 0x0100, 1, 0, 0, 0) + b"\x00" + struct.pack("!HH", 2, 1)
+
+
+def ntp_request() -> bytes:
+    """Requête NTP client (LI=0, VN=3, Mode=3), 48 octets."""
+    return b"\x1b" + b"\x00" * 47
+
+
+def snmp_get(community: bytes = b"public") -> bytes:
+    """SNMPv2c GetRequest sur sysDescr.0 (1.3.6.1.2.1.1.1.0)."""
+    request_id = _tlv(0x02, struct.pack("!I", random.getrandbits(31)))
+    varbind = _tlv(0x30, _tlv(0x06, bytes([0x2B, 6, 1, 2, 1, 1, 1, 0])) + _tlv(0x05, b""))
+    pdu = _tlv(0xA0, request_id + _tlv(0x02, b"\x00") + _tlv(0x02, b"\x00") + _tlv(0x30, varbind))
+    return _tlv(0x30, _tlv(0x02, b"\x01") + _tlv(0x04, community) + pdu)
+
+
+UDP_PAYLOADS: dict[int, Callable[[], bytes]] = {
+    53: dns_query,
+    123: ntp_request,
+    161: snmp_get,
+}
+
+
+def _family(packed: bytes) -> int:
+    return socket.AF_INET6 if len(packed) == 16 else socket.AF_INET
+
+
+def _open_sockets(family: int) -> list[socket.socket]:
+    socks = []
+    for _ in range(SOCKETS_PER_FAMILY):
+        s = socket.socket(family, socket.SOCK_DGRAM)
+        s.setblocking(False)
+        try:
+            if family == socket.AF_INET:
+                s.setsockopt(socket.IPPROTO_IP, IP_RECVERR, 1)
+            else:
+                s.setsockopt(socket.IPPROTO_IPV6, IPV6_RECVERR, 1)
+        except OSError:
+            pass  # hors Linux : pas de CLOSED, seulement OPEN / FILTERED
+        socks.append(s)
+    return socks
+
+
+def _key(addr: tuple) -> tuple[bytes | None, int]:
+    # Adresse rendue par le noyau -> (adresse binaire, port) ; "%scope" ignoré
+    return pack_ip(addr[0]), addr[1]
+
+
+def _drain(sock: socket.socket, results: dict[tuple[bytes, int], str]) -> None:
+    # 1) erreurs ICMP mises en file par IP_RECVERR (adresse = destination d'origine)
+    while True:
+        try:
+            _, ancdata, _, addr = sock.recvmsg(512, 512, socket.MSG_ERRQUEUE)
+        except (BlockingIOError, InterruptedError):
+            break
+        except OSError:
+            break
+        for _level, _type, data in ancdata:
+            if len(data) >= struct.calcsize(SOCK_EE_FORMAT):
+                ee_errno = struct.unpack_from(SOCK_EE_FORMAT, data)[0]
+                key = _key(addr)
+                if ee_errno == errno.ECONNREFUSED and results.get(key) == "FILTERED":
+                    results[key] = "CLOSED"
+
+    # 2) réponses normales
+    while True:
+        try:
+            _, addr = sock.recvfrom(4096)
+        except (BlockingIOError, InterruptedError):
+            break
+        except ConnectionRefusedError:
+            continue  # déjà traité via la file d'erreurs
+        except OSError:
+            break
+        key = _key(addr)
+        if key in results:
+            results[key] = "OPEN"
+
+
+def udp_probe_batch(
+    hosts: list[str],
+    ports: list[int],
+    timeout: float,
+    acquire: Callable[[str], bool | None] | None = None,
+    deadline: float | None = None,
+) -> dict[tuple[str, int], str]:
+    """
+    Sonde chaque (hôte, port) une fois. Les hôtes doivent être des IP.
+    acquire(host) est appelé avant chaque envoi (cadencement optionnel) ;
+    s'il rend False, les sondes restantes valent SKIPPED.
+    deadline : instant time.monotonic() après lequel on n'envoie plus et
+    on n'attend plus de réponse.
+    """
+    # Une seule sonde par adresse, quelle que soit son écriture
+    packed, by_packed = group_by_address(hosts)
+    results: dict[tuple[bytes, int], str] = {}
+    probes = [(p, port) for p in by_packed for port in ports]
+    if not probes:
+        return {(host, port): "ERROR" for host in packed for port in ports}
+
+    sockets = {family: _open_sockets(family) for family in {_family(p) for p in by_packed}}
+    selector = selectors.DefaultSelector()
+    for socks in sockets.values():
+        for s in socks:
+            selector.register(s, selectors.EVENT_READ)
+
+    for key in probes:
+        results[key] = "FILTERED"
+
+    sent_done = threading.Event()
+    last_send = [time.monotonic()]
+
+    def sender() -> None:
+        try:
+            for i, (p, port) in enumerate(probes):
+                host = by_packed[p]
+                expired = deadline is not None and time.monotonic() >= deadline
+                if expired or (acquire is not None and acquire(host) is False):
+                    for key in probes[i:]:
+                        results[key] = "SKIPPED"
+                    break
+                sock = sockets[_family(p)][i % SOCKETS_PER_FAMILY]
+                payload = UDP_PAYLOADS.get(port, bytes)()
+                try:
+                    sock.sendto(payload, (host, port))
+                except OSError:
+                    results[(p, port)] = "ERROR"
+                last_send[0] = time.monotonic()
+        finally:
+            sent_done.set()
+
+    thread = threading.Thread(target=sender, name="udp-sender", daemon=True)
+    thread.start()
+
+    def listening() -> bool:
+        now = time.monotonic()
+        if deadline is not None and now >= deadline:
+            return False
+        return not sent_done.is_set() or now < last_send[0] + timeout
+
+    try:
+        while listening():
+            for key, _ in selector.select(timeout=0.05):
+                _drain(key.fileobj, results)
+    finally:
+        thread.join()
+        selector.close()
+        for socks in sockets.values():
+            for s in socks:
+                s.close()
+
+    # Résultats rendus sous l'écriture de l'appelant ; ERROR si ce n'est pas une IP
+    return {
+        (host, port): results[(p, port)] if p is not None else "ERROR"
+        for host, p in packed.items() for port in ports
+    }
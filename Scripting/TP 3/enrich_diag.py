@@ -8,7 +8,8 @@ import socket
 import subprocess
 from pathlib import Path
 
-import requests
+from prefix_cache import PrefixCache
+from providers import PROVIDERS, Enricher
 
 TARGETS_FILE = Path("targets.txt")
 REPORT_FILE = Path("report.csv")
@@ -16,6 +17,12 @@ REPORT_FILE = Path("report.csv")
 TIMEOUT_S = 2
 PORTS = [22, 443]
 
+# Regroupement par préfixe : nb d'IP concordantes avant de répondre localement, durée de vie
+PREFIX_MIN_CONFIDENCE = 2
+PREFIX_TTL_S = 3600
+
+ENRICHER = Enricher(PROVIDERS, TIMEOUT_S, prefixes=PrefixCache(PREFIX_MIN_CONFIDENCE, PREFIX_TTL_S))
+
 
 def is_ip(value: str) -> bool:
     try:
@@ -58,46 +65,8 @@ def test_tcp(host: str, port: int) -> str:
 
 
 def ip_enrich(ip: str) -> dict:
-    out = {
-        "ip_country": "",
-        "ip_org": "",
-        "ip_asn": "",
-        "api_status": "ERROR",
-        "notes": "",
-    }
-
-    url = f"https://ipapi.co/{ip}/json/"
-
-    try:
-        r = requests.get(url, timeout=TIMEOUT_S)
-        if r.status_code != 200:
-            out["api_status"] = "KO"
-            out["notes"] = f"HTTP {r.status_code}"
-            return out
-
-        data = r.json()
-
-        # Champs typiques ipapi.co (peuvent varier)
-        out["ip_country"] = str(data.get("country_name", "") or "")
-        out["ip_org"] = str(data.get("org", "") or "")
-        # ipapi.co renvoie parfois "asn" et parfois "asn" absent selon IP / politique
-        out["ip_asn"] = str(data.get("asn", "") or "")
-
-        out["api_status"] = "OK"
-        return out
-
-    except requests.Timeout:
-        out["api_status"] = "KO"
-        out["notes"] = "API timeout"
-        return out
-    except ValueError:
-        out["api_status"] = "KO"
-        out["notes"] = "Invalid JSON"
-        return out
-    except Exception as e:
-        out["api_status"] = "ERROR"
-        out["notes"] = f"{type(e).__name__}"
-        return out
+    # Fournisseurs interchangeables, couverture (hedging) et repli : voir providers.py
+    return ENRICHER.enrich(ip)
 
 
 def main() -> int:
@@ -172,6 +141,8 @@ def main() -> int:
 
     print(f"OK: rapport généré -> {REPORT_FILE.resolve()}")
     print(f"Cibles traitées: {len(targets)}")
+    for line in ENRICHER.report_lines():
+        print(f"API {line}")
     return 0
 
 
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Regroupement des enrichissements par préfixe réseau.
+
+Les hôtes d'un même préfixe annoncé renvoient presque toujours le même
+pays / organisation / ASN. On apprend donc des associations
+préfixe -> attributs à partir des réponses de l'API, et les IP suivantes
+du même préfixe sont servies localement (plus long préfixe commun, dans
+un arbre binaire).
+
+- Préfixe annoncé par l'API (champ "network") : fiable d'emblée.
+- Sinon, préfixe supposé (/24 en IPv4, /48 en IPv6) : il faut que
+  `min_confidence` IP différentes donnent la même réponse avant de
+  servir localement. Une réponse contradictoire remet le compteur à 1.
+- Chaque entrée expire après `ttl` secondes.
+"""
+
+from __future__ import annotations
+
+import ipaddress
+import threading
+import time
+
+ATTRIBUTES = ("ip_country", "ip_org", "ip_asn")
+GUESS_PREFIXLEN = {4: 24, 6: 48}
+
+
+class _Entry:
+    __slots__ = ("network", "attrs", "confidence", "expires", "seen")
+
+    def __init__(self, network: str, attrs: tuple[str, ...], confidence: int, expires: float, ip: str) -> None:
+        self.network = network
+        self.attrs = attrs
+        self.confidence = confidence
+        self.expires = expires
+        self.seen = {ip}
+
+
+class PrefixCache:
+    def __init__(self, min_confidence: int = 2, ttl: float = 3600) -> None:
+        self.min_confidence = min_confidence
+        self.ttl = ttl
+        self.hits = 0
+        # Un arbre par version d'IP ; noeud = [fils 0, fils 1, entrée]
+        self._roots = {4: [None, None, None], 6: [None, None, None]}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _bits(address: ipaddress.IPv4Address | ipaddress.IPv6Address, length: int):
+        value = int(address)
+        width = address.max_prefixlen
+        for i in range(length):
+            yield (value >> (width - 1 - i)) & 1
+
+    def _node(self, network: ipaddress.IPv4Network | ipaddress.IPv6Network) -> list:
+        node = self._roots[network.version]
+        for bit in self._bits(network.network_address, network.prefixlen):
+            if node[bit] is None:
+                node[bit] = [None, None, None]
+            node = node[bit]
+        return node
+
+    def lookup(self, ip: str) -> dict | None:
+        """Retour : {ip_country, ip_org, ip_asn, notes} si un préfixe fiable couvre l'IP, sinon None."""
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return None
+
+        now = time.monotonic()
+        best = None
+        with self._lock:
+            node = self._roots[address.version]
+            for bit in self._bits(address, address.max_prefixlen):
+                entry = node[2]
+                if entry is not None and entry.expires > now and entry.confidence >= self.min_confidence:
+                    best = entry
+                node = node[bit]
+                if node is None:
+                    break
+            else:
+                entry = node[2]
+                if entry is not None and entry.expires > now and entry.confidence >= self.min_confidence:
+                    best = entry
+            if best is None:
+                return None
+            self.hits += 1
+
+        out = dict(zip(ATTRIBUTES, best.attrs))
+        out["notes"] = f"prefix {best.network}"
+        return out
+
+    def learn(self, ip: str, answer: dict, network: str = "") -> None:
+        """Enregistre une réponse OK de l'API pour l'IP (et le préfixe annoncé s'il est connu)."""
+        try:
+            address = ipaddress.ip_address(ip)
+            if network:
+                net = ipaddress.ip_network(network, strict=False)
+                if address not in net:
+                    network = ""
+            if not network:
+                net = ipaddress.ip_network(f"{ip}/{GUESS_PREFIXLEN[address.version]}", strict=False)
+        except ValueError:
+            return
+
+        attrs = tuple(answer.get(k, "") for k in ATTRIBUTES)
+        # Préfixe annoncé : fiable d'emblée ; préfixe supposé : à confirmer
+        confidence = self.min_confidence if network else 1
+        expires = time.monotonic() + self.ttl
+
+        with self._lock:
+            node = self._node(net)
+            entry = node[2]
+            if entry is None or entry.expires <= time.monotonic() or entry.attrs != attrs:
+                node[2] = _Entry(str(net), attrs, confidence, expires, ip)
+            elif entry.confidence < self.min_confidence and ip not in entry.seen:
+                entry.seen.add(ip)
+                entry.confidence = max(entry.confidence + 1, confidence)
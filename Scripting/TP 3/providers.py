@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Fournisseurs d'enrichissement IP (pays / organisation / ASN).
+
+Chaque fournisseur a son URL et sa correspondance de champs vers
+ip_country, ip_org, ip_asn, toujours sous la même forme quel que soit
+le fournisseur qui répond : code pays ISO ("US"), nom du titulaire de
+l'AS, numéro "AS15169". L'Enricher les combine :
+- requête couverte (hedging) : si le premier fournisseur n'a pas répondu
+  après son p95 de latence observé, la même IP part vers le suivant ;
+  la première réponse OK gagne ;
+- repli ordonné : sur KO / ERROR, on passe au fournisseur suivant ;
+- compteurs par fournisseur : requêtes, OK, KO, ERROR, latence p50 / p95 ;
+- regroupement par préfixe (optionnel) : voir prefix_cache.py.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable
+
+import requests
+
+from prefix_cache import PrefixCache
+
+HEDGE_DEFAULT_S = 1.0    # délai de couverture tant qu'on n'a pas assez de mesures
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200     # dernières latences gardées par fournisseur
+
+Field = Callable[[dict], str]
+
+
+def field(name: str) -> Field:
+    return lambda data: str(data.get(name, "") or "")
+
+
+def as_number(name: str) -> Field:
+    """ "AS15169 Google LLC" -> "AS15169" """
+    return lambda data: str(data.get(name, "") or "").split(" ", 1)[0]
+
+
+def as_name(name: str) -> Field:
+    """ "AS15169 Google LLC" -> "Google LLC" """
+    return lambda data: (str(data.get(name, "") or "").split(" ", 1) + [""])[1]
+
+
+class Provider:
+    def __init__(
+        self,
+        name: str,
+        url: str,
+        mapping: dict[str, Field],
+        error: Callable[[dict], str] | None = None,
+        network: Field | None = None,
+    ) -> None:
+        self.name = name
+        self.url = url
+        self.mapping = mapping
+        self.error = error  # data -> message si l'API signale une erreur dans un HTTP 200
+        self.network = network  # data -> préfixe annoncé ("8.8.8.0/24"), si l'API le donne
+
+    def query(self, ip: str, timeout: float) -> tuple[dict, str]:
+        """
+        Retour : (colonnes comme ip_enrich : ip_country, ip_org, ip_asn, api_status, notes,
+                  préfixe annoncé ou "").
+        """
+        network = ""
+        out = {"ip_country": "", "ip_org": "", "ip_asn": "", "api_status": "ERROR", "notes": ""}
+        try:
+            r = requests.get(self.url.format(ip=ip), timeout=timeout)
+            if r.status_code != 200:
+                out["api_status"] = "KO"
+                out["notes"] = f"HTTP {r.status_code}"
+                return out, network
+
+            data = r.json()
+            message = self.error(data) if self.error else ""
+            if message:
+                out["api_status"] = "KO"
+                out["notes"] = message
+                return out, network
+
+            for column, extract in self.mapping.items():
+                out[column] = extract(data)
+            if self.network:
+                network = self.network(data)
+            out["api_status"] = "OK"
+            return out, network
+
+        except requests.Timeout:
+            out["api_status"] = "KO"
+            out["notes"] = "API timeout"
+            return out, network
+        except ValueError:
+            out["api_status"] = "KO"
+            out["notes"] = "Invalid JSON"
+            return out, network
+        except Exception as e:
+            out["api_status"] = "ERROR"
+            out["notes"] = f"{type(e).__name__}"
+            return out, network
+
+
+PROVIDERS = [
+    Provider(
+        "ipapi.co",
+        "https://ipapi.co/{ip}/json/",
+        {"ip_country": field("country_code"), "ip_org": field("org"), "ip_asn": field("asn")},
+        error=lambda d: str(d.get("reason", "API error")) if d.get("error") else "",
+        network=field("network"),
+    ),
+    Provider(
+        "ip-api.com",
+        "http://ip-api.com/json/{ip}?fields=status,message,countryCode,as",
+        {"ip_country": field("countryCode"), "ip_org": as_name("as"), "ip_asn": as_number("as")},
+        error=lambda d: str(d.get("message", "API error")) if d.get("status") == "fail" else "",
+    ),
+    Provider(
+        "ipinfo.io",
+        "https://ipinfo.io/{ip}/json",
+        {"ip_country": field("country"), "ip_org": as_name("org"), "ip_asn": as_number("org")},
+        error=lambda d: str(d.get("error", {}).get("title", "API error")) if "error" in d else "",
+    ),
+]
+
+
+class ProviderStats:
+    def __init__(self) -> None:
+        self.requests = 0
+        self.counts = {"OK": 0, "KO": 0, "ERROR": 0}
+        self.latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def quantile(self, q: float) -> float | None:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class Enricher:
+    def __init__(
+        self,
+        providers: list[Provider],
+        timeout: float,
+        workers: int = 8,
+        prefixes: PrefixCache | None = None,
+    ) -> None:
+        self.providers = providers
+        self.timeout = timeout
+        self.prefixes = prefixes
+        self.stats = {p.name: ProviderStats() for p in providers}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="enrich")
+
+    def hedge_delay(self, provider: Provider) -> float:
+        with self._lock:
+            stats = self.stats[provider.name]
+            if len(stats.latencies) < HEDGE_MIN_SAMPLES:
+                return HEDGE_DEFAULT_S
+            return stats.quantile(0.95)
+
+    def _call(self, provider: Provider, ip: str) -> tuple[Provider, dict, str]:
+        start = time.perf_counter()
+        out, network = provider.query(ip, self.timeout)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            stats = self.stats[provider.name]
+            stats.requests += 1
+            stats.counts[out["api_status"]] += 1
+            if out["api_status"] == "OK":
+                stats.latencies.append(elapsed)
+        return provider, out, network
+
+    def enrich(self, ip: str) -> dict:
+        if self.prefixes is not None:
+            known = self.prefixes.lookup(ip)
+            if known is not None:
+                return {**known, "api_status": "OK"}
+
+        remaining = list(self.providers)
+        in_flight = set()
+        failures: list[str] = []
+        last: dict | None = None
+        hedged = False
+
+        in_flight.add(self._pool.submit(self._call, remaining.pop(0), ip))
+        first = self.providers[0]
+
+        while in_flight:
+            # On ne couvre qu'une fois, et seulement le premier fournisseur
+            delay = self.hedge_delay(first) if not hedged and remaining else None
+            done, in_flight = wait(in_flight, timeout=delay, return_when=FIRST_COMPLETED)
+
+            if not done:
+                hedged = True
+                in_flight.add(self._pool.submit(self._call, remaining.pop(0), ip))
+                continue
+
+            for future in done:
+                provider, out, network = future.result()
+                if out["api_status"] == "OK":
+                    if self.prefixes is not None:
+                        self.prefixes.learn(ip, out, network)
+                    return out  # les requêtes encore en vol finissent en arrière-plan
+                failures.append(f"{provider.name}: {out['notes']}")
+                last = out
+
+            # Repli : au plus un fournisseur en vol tant qu'il en reste
+            if not in_flight and remaining:
+                hedged = True
+                in_flight.add(self._pool.submit(self._call, remaining.pop(0), ip))
+
+        out = dict(last) if last else {"ip_country": "", "ip_org": "", "ip_asn": "", "api_status": "ERROR", "notes": ""}
+        out["notes"] = " | ".join(failures)
+        return out
+
+    def report_lines(self) -> list[str]:
+        lines = []
+        with self._lock:
+            for name, s in self.stats.items():
+                p50, p95 = s.quantile(0.5), s.quantile(0.95)
+                latency = f"p50={p50 * 1000:.0f}ms p95={p95 * 1000:.0f}ms" if p50 is not None else "latence n/a"
+                lines.append(
+                    f"{name}: {s.requests} requêtes, OK={s.counts['OK']} KO={s.counts['KO']} "
+                    f"ERROR={s.counts['ERROR']}, {latency}"
+                )
+        if self.prefixes is not None:
+            lines.append(f"cache préfixes: {self.prefixes.hits} réponses locales")
+        return lines